@@ -5,9 +5,12 @@ This script combines fetching feeds, building EPUB, and uploading to Dropbox.
 """
 
 import argparse
+import itertools
 import logging
 import logging.config
+import queue
 import sys
+import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union, Tuple, Type, TypeVar, cast
 
@@ -18,66 +21,58 @@ if project_root not in sys.path:
 
 # Import logging configuration
 from config.logging_config import get_logging_config
-from scripts.utils.logging_utils import log_execution_time, setup_logger
 
-# Set up logging
-logging.config.dictConfig(get_logging_config(debug=False))
-logger = logging.getLogger(__name__)
+# Module logger, resolved on first use rather than at import time
+_LOGGER: Optional[logging.Logger] = None
 
-def parse_arguments() -> argparse.Namespace:
+def _log() -> logging.Logger:
+    """Return the module logger, creating it on first use."""
+    global _LOGGER
+    if _LOGGER is None:
+        _LOGGER = logging.getLogger(__name__)
+    return _LOGGER
+
+# Command line parser, built once at import time
+_PARSER: argparse.ArgumentParser = argparse.ArgumentParser(description="RSS to Kobo workflow")
+_PARSER.add_argument(
+    "--user",
+    type=str,
+    required=True,
+    help="Username for feed configuration"
+)
+_PARSER.add_argument(
+    "--output",
+    type=str,
+    default="",
+    help="Output EPUB file path (default: auto-generated)"
+)
+_PARSER.add_argument(
+    "--no-upload",
+    action="store_true",
+    help="Skip Dropbox upload"
+)
+_PARSER.add_argument(
+    "--debug",
+    action="store_true",
+    help="Enable debug logging"
+)
+_PARSER.add_argument(
+    "--target",
+    type=str,
+    default="Daily-RSS.epub",
+    help="Target filename in Dropbox (default: Daily-RSS.epub)",
+)
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
     """Parse command line arguments.
     
+    Args:
+        argv: Argument list to parse (default: sys.argv[1:])
+    
     Returns:
         Parsed command line arguments
     """
-    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="RSS to Kobo workflow")
-    # Add arguments with type hints
-    parser.add_argument(
-        "--user",
-        type=str,
-        required=True,
-        help="Username for feed configuration"
-    )
-    parser.add_argument(
-        "--output",
-        type=str,
-        default="",
-        help="Output EPUB file path (default: auto-generated)"
-    )
-    parser.add_argument(
-        "--no-upload",
-        action="store_true",
-        help="Skip Dropbox upload"
-    )
-    parser.add_argument(
-        "--debug",
-        action="store_true",
-        help="Enable debug logging"
-    )
-    parser.add_argument(
-        "--target",
-        type=str,
-        default="Daily-RSS.epub",
-        help="Target filename in Dropbox (default: Daily-RSS.epub)",
-    )
-    return parser.parse_args()
-
-@log_execution_time(logging.getLogger(__name__))
-def setup_environment(debug: bool = False) -> bool:
-    """Set up the Python environment and check requirements.
-    
-    Returns:
-        bool: True if setup was successful, False otherwise
-    """
-    try:
-        # Add project root to Python path
-        project_root = Path(__file__).parent
-        if str(project_root) not in sys.path:
-            sys.path.insert(0, str(project_root))
-        return True
-    except Exception as e:
-        logger.error(f"Failed to set up environment: {e}")
-        return False
+    return _PARSER.parse_args(argv)
 
 def main() -> int:
     """Run the complete RSS to Kobo workflow.
@@ -87,106 +82,98 @@ def main() -> int:
     """
     args = parse_arguments()
     
-    if not setup_environment():
-        return 1
+    # Set up logging once, at the requested level
+    logging.config.dictConfig(get_logging_config(debug=args.debug))
+    if args.debug:
+        _log().debug("Debug logging enabled")
     
-    # Set up debug logging if requested
-    if getattr(args, 'debug', False):
-        logging.config.dictConfig(get_logging_config(debug=True))
-        logger.debug("Debug logging enabled")
-
-    # Import modules after setting up environment
-    logger.debug("Importing required modules...")
+    # Import modules after setting up logging
+    _log().debug("Importing required modules...")
     try:
-        from scripts.fetch_and_build import FeedFetcher, build_epub
-        from scripts.upload_to_dropbox import upload_to_dropbox
-        logger.debug("Successfully imported all required modules")
+        from scripts.epub_builder import build_epub_from_stream
+        from scripts.fetch_and_build import FeedFetcher
+        _log().debug("Successfully imported all required modules")
     except ImportError as e:
-        logger.critical("Failed to import required modules: %s", e, exc_info=True)
-        logger.error("Make sure you're running from the project root directory and all dependencies are installed.")
+        _log().critical("Failed to import required modules: %s", e, exc_info=True)
+        _log().error("Make sure you're running from the project root directory and all dependencies are installed.")
         return 1
     
-    # Step 1: Fetch feeds
+    # Step 1: Start fetching feeds in the background
     try:
-        logger.info("Starting feed fetch for user: %s", args.user)
-        logger.debug("Initializing FeedFetcher...")
+        _log().info("Starting feed fetch for user: %s", args.user)
+        _log().debug("Initializing FeedFetcher...")
         fetcher: FeedFetcher = FeedFetcher(args.user)
         
-        logger.debug("Fetching all feeds...")
-        feeds_data = fetcher.fetch_all()
-        
-        # Debug: Print the type and first few items of feeds_data
-        logger.debug("Type of feeds_data: %s", type(feeds_data))
-        if feeds_data:
-            logger.debug("Feed names: %s", list(feeds_data.keys()))
-            for feed_name, articles in list(feeds_data.items())[:3]:
-                logger.debug("Feed '%s' has %d articles", feed_name, len(articles))
-                if articles:
-                    logger.debug("First article title: %s", articles[0].get('title', 'No title'))
+        _log().debug("Fetching all feeds...")
+        feed_queue: "queue.Queue[Optional[Tuple[str, List[Dict[str, Any]]]]]" = queue.Queue()
+        producer = threading.Thread(
+            target=fetcher.fetch_stream, args=(feed_queue,),
+            name="feed-fetcher", daemon=True
+        )
+        producer.start()
         
-        if not feeds_data or not any(articles for articles in feeds_data.values()):
-            logger.warning("No feed data was returned from fetch_all()")
+        # Wait for the first feed so an empty run fails before an EPUB is started
+        feeds = iter(feed_queue.get, None)
+        first = next(feeds, None)
+        if first is None:
+            _log().warning("No feed data was returned from fetch_stream()")
             return 1
             
-        logger.info("Successfully fetched data from %d feed(s)", len(feeds_data))
+        _log().debug("First feed ready: '%s' with %d articles", first[0], len(first[1]))
                     
     except Exception as e:
-        logger.critical("Critical error while fetching feeds: %s", e, exc_info=True)
+        _log().critical("Critical error while fetching feeds: %s", e, exc_info=True)
         return 1
     
-    # Step 2: Build EPUB
+    # Step 2: Build EPUB, adding each feed as soon as it has been fetched
     try:
-        logger.info("Starting EPUB generation from %d feed(s)...", len(feeds_data))
-        logger.debug("Calling build_epub with user: %s", args.user)
+        _log().info("Starting EPUB generation...")
+        _log().debug("Calling build_epub_from_stream with user: %s", args.user)
         
-        # The feeds_data is already in the correct format for build_epub
-        # It's a dictionary where keys are feed names and values are lists of articles
-        epub_path: Optional[str] = build_epub(args.user, feeds_data)
+        epub_path, size_bytes = build_epub_from_stream(args.user, itertools.chain([first], feeds))
+        producer.join()
         
         if not epub_path:
-            logger.error("build_epub returned None or empty path")
+            _log().error("build_epub returned None or empty path")
             return 1
             
-        epub_path_obj = Path(epub_path)
-        if not epub_path_obj.exists():
-            logger.error("EPUB file does not exist at path: %s", epub_path)
-            return 1
-            
-        file_size = epub_path_obj.stat().st_size / (1024 * 1024)  # Size in MB
-        logger.info("✅ Successfully generated EPUB (%.2f MB): %s", 
+        file_size = size_bytes / (1024 * 1024)  # Size in MB
+        _log().info("✅ Successfully generated EPUB (%.2f MB): %s", 
                    file_size, epub_path)
         
     except Exception as e:
-        logger.critical("Critical error during EPUB generation: %s", e, exc_info=True)
+        _log().critical("Critical error during EPUB generation: %s", e, exc_info=True)
         return 1
     
     # Step 3: Upload to Dropbox (unless disabled)
     if not args.no_upload and epub_path is not None:
         try:
-            logger.info("Initiating Dropbox upload for file: %s", epub_path)
-            logger.debug("Target path in Dropbox: %s", args.target)
+            # Only pay for the Dropbox SDK import when actually uploading
+            from scripts.upload_to_dropbox import upload_to_dropbox
+            
+            _log().info("Dropbox upload | file=%s target=%s", epub_path, args.target)
             
             success: bool = upload_to_dropbox(epub_path, args.user, args.target)
             
             if not success:
-                logger.error("❌ Upload to Dropbox failed (returned False)")
+                _log().error("❌ Upload to Dropbox failed | target=%s", args.target)
                 return 1
                 
-            logger.info("✅ Successfully uploaded to Dropbox as '%s'", args.target)
+            _log().info("✅ Upload done | target=%s", args.target)
             
         except Exception as e:
-            logger.critical("Critical error during Dropbox upload: %s", e, exc_info=True)
+            _log().critical("Critical error during Dropbox upload: %s", e, exc_info=True)
             return 1
             
     elif not args.no_upload:
-        logger.critical("Cannot proceed with Dropbox upload: No valid EPUB file path available")
+        _log().critical("Cannot proceed with Dropbox upload: No valid EPUB file path available")
         return 1
     else:
-        logger.info("ℹ️  Dropbox upload skipped as requested (--no-upload flag was set)")
-        logger.debug("EPUB file remains at: %s", epub_path)
+        _log().info("ℹ️  Dropbox upload skipped as requested (--no-upload flag was set)")
+        _log().debug("EPUB file remains at: %s", epub_path)
     
-    logger.info("✅ RSS to Kobo workflow completed successfully")
-    logger.debug("Exiting with status code 0")
+    _log().info("✅ RSS to Kobo workflow completed successfully")
+    _log().debug("Exiting with status code 0")
     return 0
 
 if __name__ == "__main__":
@@ -1,17 +1,28 @@
 """
 RSS to Kobo scripts package.
 """
+import importlib
 
 __version__ = "2.0.0"
 
-# Import main components for easier access
-from .epub_builder import EPUBCreator, build_epub
-from .fetch_and_build import FeedFetcher, main as fetch_and_build
-from .upload_to_dropbox import upload_to_dropbox, main as upload_main
-from .utils.logging_utils import setup_logger
-from .utils.general import load_feeds_config, get_output_path, clean_html, format_date
+# Main components are resolved lazily on first attribute access (PEP 562) so
+# that importing a subpackage such as ``scripts.auth`` does not pull in
+# lxml or the Dropbox SDK.
+_LAZY = {
+    "FeedFetcher": (".fetch_and_build", "FeedFetcher"),
+    "fetch_and_build": (".fetch_and_build", "main"),
+    "build_epub": (".epub_builder", "build_epub"),
+    "EPUBCreator": (".epub_builder", "EPUBCreator"),
+    "upload_to_dropbox": (".upload_to_dropbox", "upload_to_dropbox"),
+    "upload_main": (".upload_to_dropbox", "main"),
+    "setup_logger": (".utils.logging_utils", "setup_logger"),
+    "load_feeds_config": (".utils.general", "load_feeds_config"),
+    "get_output_path": (".utils.general", "get_output_path"),
+    "clean_html": (".utils.general", "clean_html"),
+    "format_date": (".utils.general", "format_date"),
+    "format_dates": (".utils.general", "format_dates"),
+}
 
-# Import these conditionally to avoid circular imports
 __all__ = [
     "FeedFetcher",
     "fetch_and_build",
@@ -24,4 +35,19 @@ __all__ = [
     "get_output_path",
     "clean_html",
     "format_date",
+    "format_dates",
 ]
+
+
+def __getattr__(name):
+    try:
+        mod_name, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(mod_name, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(__all__)
@@ -5,6 +5,8 @@ This module handles OAuth 2.0 authentication with Dropbox,
 token management, and secure credential storage.
 """
 
+import importlib
+
 # Core components
 from .config import get_oauth_config, get_token_path, is_debug
 from .exceptions import (
@@ -15,14 +17,21 @@ from .exceptions import (
     ConfigurationError,
     AuthorizationError
 )
-from .oauth_handler import OAuthHandler
-from .secure_storage import SecureTokenStorage
-
-# CLI interface
-from .cli import run_oauth_flow, check_auth, logout_user
 
 __version__ = "0.2.0"
 
+# Components that need the Dropbox SDK or cryptography are resolved lazily
+# on first attribute access (PEP 562)
+_LAZY = {
+    'OAuthHandler': ('.oauth_handler', 'OAuthHandler'),
+    'SecureTokenStorage': ('.secure_storage', 'SecureTokenStorage'),
+    
+    # CLI interface
+    'run_oauth_flow': ('.cli', 'run_oauth_flow'),
+    'check_auth': ('.cli', 'check_auth'),
+    'logout_user': ('.cli', 'logout_user'),
+}
+
 __all__ = [
     # Core components
     'OAuthHandler',
@@ -47,3 +56,16 @@ __all__ = [
     'AuthorizationError',
 ]
 
+
+def __getattr__(name):
+    try:
+        mod_name, attr = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(mod_name, __name__), attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(__all__)
@@ -3,25 +3,40 @@ Command-line interface for OAuth authentication.
 """
 import logging
 import sys
-import webbrowser
+from functools import lru_cache
 from http.server import HTTPServer, BaseHTTPRequestHandler
-from threading import Thread
-from typing import Optional, Any
+from typing import TYPE_CHECKING, Optional, Any
 from urllib.parse import urlparse, parse_qs
 
 from . import config, exceptions
-from .oauth_handler import OAuthHandler
-from dropbox import Dropbox  # Add this import
 
-logger = logging.getLogger(__name__)
+# OAuthHandler (and with it the token storage and cryptography) is imported
+# inside the functions that use it, so importing this module stays cheap
+if TYPE_CHECKING:
+    from .oauth_handler import OAuthHandler
+
+# Module logger, resolved on first use rather than at import time
+_LOGGER: Optional[logging.Logger] = None
+
+def _log() -> logging.Logger:
+    """Return the module logger, creating it on first use."""
+    global _LOGGER
+    if _LOGGER is None:
+        _LOGGER = logging.getLogger(__name__)
+    return _LOGGER
+
+class OAuthCallbackServer(HTTPServer):
+    """HTTP server that records the result of a single OAuth callback."""
+    
+    auth_code: Optional[str] = None
+    error: Optional[str] = None
+
 
 class OAuthCallbackHandler(BaseHTTPRequestHandler):
-    """Simple HTTP server to handle OAuth callbacks."""
+    """Simple HTTP server to handle OAuth callbacks.
     
-    def __init__(self, request, client_address, server):
-        self.auth_code = None
-        self.error = None
-        super().__init__(request, client_address, server)
+    The callback result is recorded on the server (see OAuthCallbackServer).
+    """
     
     def do_GET(self):
         """Handle GET requests to the callback URL."""
@@ -30,7 +45,7 @@ class OAuthCallbackHandler(BaseHTTPRequestHandler):
         params = parse_qs(query)
         
         if 'code' in params:
-            self.auth_code = params['code'][0]
+            self.server.auth_code = params['code'][0]
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
             self.end_headers()
@@ -39,21 +54,23 @@ class OAuthCallbackHandler(BaseHTTPRequestHandler):
                 b"<p>You can close this window and return to the application.</p></body></html>"
             )
         elif 'error' in params:
-            self.error = params['error'][0]
+            self.server.error = params['error'][0]
             self.send_response(400)
             self.send_header('Content-type', 'text/plain')
             self.end_headers()
-            self.wfile.write(f"Error: {self.error}".encode())
+            self.wfile.write(f"Error: {self.server.error}".encode())
         else:
             self.send_response(400)
             self.send_header('Content-type', 'text/plain')
             self.end_headers()
             self.wfile.write(b"Invalid request")
-        
-        # Shutdown the server after handling the request
-        def shutdown():
-            self.server.shutdown()
-        Thread(target=shutdown).start()
+
+
+@lru_cache(maxsize=8)
+def _cached_auth_url(username: str) -> str:
+    """Get the authorization URL for a user, generated once per process."""
+    from .oauth_handler import OAuthHandler
+    return OAuthHandler(username).get_authorization_url()
 
 
 def run_oauth_flow(username: str) -> bool:
@@ -65,55 +82,52 @@ def run_oauth_flow(username: str) -> bool:
     Returns:
         bool: True if authentication was successful, False otherwise
     """
+    from .oauth_handler import OAuthHandler
+    
     try:
-        oauth = OAuthHandler(username)
-        
         # Step 1: Get authorization URL and open in browser
-        auth_url = oauth.get_authorization_url()
+        auth_url = _cached_auth_url(username)
         print(f"Opening authorization URL in your browser: {auth_url}")
         print("If the browser doesn't open, please copy and paste the URL into your browser.")
         
         # Try to open the URL in the default browser
         try:
+            import webbrowser
             webbrowser.open(auth_url)
         except Exception as e:
-            logger.warning(f"Could not open browser: {e}")
+            _log().warning("Could not open browser: %s", e)
         
         # Step 2: Start a local server to handle the redirect
         oauth_config = config.get_oauth_config()
         port = oauth_config.get('redirect_port', 5000)
         
-        with HTTPServer(('localhost', port), OAuthCallbackHandler) as httpd:
+        with OAuthCallbackServer(('localhost', port), OAuthCallbackHandler) as httpd:
             print(f"Waiting for authorization response on port {port}...")
-            # Run the server in a separate thread
-            server_thread = Thread(target=httpd.serve_forever)
-            server_thread.daemon = True
-            server_thread.start()
-            
-            # Wait for the server to handle the request
-            server_thread.join(timeout=300)  # 5 minute timeout
+            # Block until a single callback request arrives
+            httpd.auth_code = None
+            httpd.error = None
+            httpd.timeout = 300  # 5 minute timeout
+            httpd.handle_request()
             
             # Check if we got an auth code
-            if hasattr(httpd, 'RequestHandlerClass'):
-                handler = httpd.RequestHandlerClass
-                if hasattr(handler, 'auth_code') and handler.auth_code:
-                    # Complete the OAuth flow
-                    redirect_url = f"http://localhost:{port}/?code={handler.auth_code}"
-                    oauth.finish_authorization(redirect_url)
-                    print("Successfully authenticated with Dropbox!")
-                    return True
-                elif hasattr(handler, 'error') and handler.error:
-                    print(f"Authorization error: {handler.error}")
-                else:
-                    print("Authorization timed out or was cancelled.")
+            if httpd.auth_code:
+                # Complete the OAuth flow
+                redirect_url = f"http://localhost:{port}/?code={httpd.auth_code}"
+                OAuthHandler(username).finish_authorization(redirect_url)
+                print("Successfully authenticated with Dropbox!")
+                return True
+            elif httpd.error:
+                print(f"Authorization error: {httpd.error}")
+            else:
+                print("Authorization timed out or was cancelled.")
             
             return False
             
     except exceptions.AuthenticationError as e:
-        logger.error(f"Authentication failed: {e}")
+        _log().error("Authentication failed: %s", e)
         return False
     except Exception as e:
-        logger.exception("Unexpected error during OAuth flow")
+        _log().exception("Unexpected error during OAuth flow")
         return False
 
 
@@ -126,6 +140,8 @@ def check_auth(username: str) -> bool:
     Returns:
         bool: True if authenticated, False otherwise
     """
+    from .oauth_handler import OAuthHandler
+    
     try:
         oauth = OAuthHandler(username)
         if oauth.is_authenticated():
@@ -135,7 +151,7 @@ def check_auth(username: str) -> bool:
             print(f"User '{username}' is not authenticated.")
             return False
     except Exception as e:
-        logger.error(f"Error checking authentication status: {e}")
+        _log().error("Error checking authentication status: %s", e)
         return False
 
 
@@ -148,6 +164,8 @@ def logout_user(username: str) -> bool:
     Returns:
         bool: True if logout was successful, False otherwise
     """
+    from .oauth_handler import OAuthHandler
+    
     try:
         oauth = OAuthHandler(username)
         if oauth.logout():
@@ -156,7 +174,7 @@ def logout_user(username: str) -> bool:
         else:
             print(f"Failed to log out user '{username}'.")
     except Exception as e:
-        logger.error(f"Error during logout: {e}")
+        _log().error("Error during logout: %s", e)
         return False
 
 
@@ -169,14 +187,13 @@ def get_authenticated_client(username: str) -> Optional[Any]:
     Returns:
         An authenticated client if available, None otherwise
     """
+    from .oauth_handler import OAuthHandler
+    
     try:
-        from dropbox import Dropbox
-        from .oauth_handler import OAuthHandler
-        
         handler = OAuthHandler(username)
         return handler.get_authenticated_client()
     except Exception as e:
-        logger.error(f"Failed to get authenticated client: {e}")
+        _log().error("Failed to get authenticated client: %s", e)
         return None
 
 def main():
@@ -229,7 +246,8 @@ def main():
         if args.command == 'login':
             print(f"Starting OAuth flow for user: {args.username}")
             if args.no_browser:
-                auth_url = OAuthHandler(args.username).get_authorization_url()
+                from .oauth_handler import OAuthHandler
+                auth_url = _cached_auth_url(args.username)
                 print(f"Please visit this URL to authorize the application:\n\n{auth_url}\n")
                 auth_code = input("Enter the authorization code from the URL: ").strip()
                 handler = OAuthHandler(args.username)
@@ -269,7 +287,7 @@ def main():
         return 0
         
     except Exception as e:
-        logger.error(f"Error: {e}", exc_info=True)
+        _log().error("Error: %s", e, exc_info=True)
         print(f"\n❌ An error occurred: {e}")
         return 1
 
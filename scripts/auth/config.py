@@ -2,17 +2,16 @@
 Configuration and environment variable handling for RSS to Kobo.
 """
 import os
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 
 from dotenv import load_dotenv
 
 # Module version
 __version__ = "0.2.0"
 
-# Load environment variables from .env file if it exists
-load_dotenv()
-
 # Base directory of the project
 BASE_DIR = Path(__file__).parent.parent.parent
 
@@ -21,26 +20,52 @@ DEFAULT_OAUTH_REDIRECT_PORT = 5000
 DEFAULT_TOKEN_EXPIRY_BUFFER = 300  # 5 minutes in seconds
 
 
+# Whether the .env file has been loaded into the environment yet
+_dotenv_loaded = False
+
+
+def _ensure_dotenv() -> None:
+    """Load the .env file on first use instead of at import time.
+    
+    Set SKIP_DOTENV to rely on the process environment only (e.g. in containers).
+    """
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    if os.getenv("SKIP_DOTENV"):
+        return
+    load_dotenv()
+
+
 def get_env_variable(name: str, default: Optional[str] = None) -> str:
     """Get environment variable or raise an error if not found and no default provided."""
+    _ensure_dotenv()
     value = os.getenv(name, default)
     if value is None:
         raise ValueError(f"Required environment variable {name} is not set")
     return value
 
 
-def get_oauth_config() -> dict:
-    """Get OAuth configuration from environment variables."""
-    return {
+@lru_cache(maxsize=1)
+def get_oauth_config() -> Mapping[str, Any]:
+    """Get OAuth configuration from environment variables.
+    
+    The result is cached for the lifetime of the process and is read-only,
+    since every caller shares it; call ``get_oauth_config.cache_clear()``
+    after changing the environment.
+    """
+    return MappingProxyType({
         "app_key": get_env_variable("DROPBOX_APP_KEY"),
         "app_secret": get_env_variable("DROPBOX_APP_SECRET"),
         "redirect_port": int(
-            os.getenv("OAUTH_REDIRECT_PORT", DEFAULT_OAUTH_REDIRECT_PORT)
+            get_env_variable("OAUTH_REDIRECT_PORT", str(DEFAULT_OAUTH_REDIRECT_PORT))
         ),
         "token_expiry_buffer": DEFAULT_TOKEN_EXPIRY_BUFFER,
-    }
+    })
 
 
+@lru_cache(maxsize=32)
 def get_token_path(username: str) -> Path:
     """Get the path to store tokens for a given username.
     
@@ -56,6 +81,11 @@ def get_token_path(username: str) -> Path:
     return tokens_dir / username
 
 
+@lru_cache(maxsize=1)
 def is_debug() -> bool:
-    """Check if debug mode is enabled."""
-    return os.getenv("DEBUG", "false").lower() == "true"
+    """Check if debug mode is enabled.
+    
+    Cached like :func:`get_oauth_config`; call ``is_debug.cache_clear()``
+    after changing the environment.
+    """
+    return get_env_variable("DEBUG", "false").lower() == "true"
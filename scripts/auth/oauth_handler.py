@@ -3,27 +3,34 @@ OAuth 2.0 handler for Dropbox authentication.
 """
 import logging
 import os
-import webbrowser
-import requests
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Any, Union, Tuple, List, Type, TypeVar, cast
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Any, Union, Tuple, List, Type, TypeVar, cast
 
-from dropbox import DropboxOAuth2FlowNoRedirect, Dropbox
+import requests
 from requests.exceptions import RequestException
 
 from . import config, exceptions
 from .secure_storage import SecureTokenStorage
 from ..utils.logging_utils import log_execution_time
 
+# The Dropbox SDK is imported where it is used so that token checks that
+# short-circuit (e.g. no stored tokens) never load it
+if TYPE_CHECKING:
+    from dropbox import Dropbox, DropboxOAuth2FlowNoRedirect
+
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
 # OAuth 2.0 scopes required by the application
-SCOPES = [
+SCOPES = (
     'files.content.write',
     'files.content.read',
     'account_info.read',
-]
+)
+
+# User agent sent with every Dropbox API request
+_USER_AGENT = f"RSS-to-Kobo/{getattr(config, '__version__', 'unknown')}"
 
 # Constants
 DEFAULT_TOKEN_EXPIRY_BUFFER = 300  # 5 minutes in seconds
@@ -31,6 +38,17 @@ DEFAULT_TOKEN_EXPIRY_BUFFER = 300  # 5 minutes in seconds
 class OAuthHandler:
     """Handle OAuth 2.0 authentication flow and token management."""
     
+    # Connection pool shared by all Dropbox clients created in this process
+    _session: Optional[requests.Session] = None
+    
+    # Per-user token snapshots and refresh locks shared by all handlers in
+    # this process, so concurrent callers trigger at most one refresh. Each
+    # snapshot is keyed on the token file's mtime so that changes made
+    # elsewhere (another process, a logout, a deleted file) are picked up.
+    _cached_tokens: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    _refresh_locks: Dict[str, threading.Lock] = {}
+    _refresh_locks_guard = threading.Lock()
+    
     def __init__(self, username: str, password: Optional[str] = None) -> None:
         """Initialize the OAuth handler for a user.
         
@@ -41,20 +59,61 @@ class OAuthHandler:
         self.username = username
         self.oauth_flow = None
         self._client = None
+        self._client_token = None
         self.storage = SecureTokenStorage(username, password=password)
-        logger.debug(f"Initialized OAuthHandler for user: {username}")
+        logger.debug("Initialized OAuthHandler for user: %s", username)
+    
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        """Get the pooled HTTP session shared by Dropbox clients."""
+        if cls._session is None:
+            from dropbox import create_session
+            cls._session = create_session(max_connections=10)
+        return cls._session
+    
+    def _token_mtime(self) -> Optional[int]:
+        """Get the token file's modification time, or None if it is missing."""
+        try:
+            return os.stat(self.storage.token_path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _get_cached_tokens(self) -> Optional[Dict[str, Any]]:
+        """Get the cached tokens if the token file has not changed since."""
+        cached = self._cached_tokens.get(self.username)
+        if cached is None:
+            return None
+        mtime, tokens = cached
+        if mtime != self._token_mtime():
+            self._cached_tokens.pop(self.username, None)
+            return None
+        return tokens
+    
+    def _cache_tokens(self, tokens: Dict[str, Any]) -> None:
+        """Cache tokens just saved to or loaded from the token file."""
+        mtime = self._token_mtime()
+        if mtime is None:
+            self._cached_tokens.pop(self.username, None)
+        else:
+            self._cached_tokens[self.username] = (mtime, tokens)
+    
+    def _get_refresh_lock(self) -> threading.Lock:
+        """Get the lock serializing token refreshes for this user."""
+        with self._refresh_locks_guard:
+            return self._refresh_locks.setdefault(self.username, threading.Lock())
         
-    @log_execution_time(logger)
     def _get_auth_flow(self) -> 'DropboxOAuth2FlowNoRedirect':
         """Get an OAuth 2.0 flow instance."""
         if self.oauth_flow is None:
+            from dropbox import DropboxOAuth2FlowNoRedirect
+            
             logger.debug("Initializing new OAuth flow")
             oauth_config = config.get_oauth_config()
             self.oauth_flow = DropboxOAuth2FlowNoRedirect(
                 oauth_config['app_key'],
                 oauth_config['app_secret'],
                 token_access_type='offline',
-                scope=SCOPES,
+                scope=list(SCOPES),  # the SDK only accepts a list
             )
             logger.debug("OAuth flow initialized with scopes: %s", SCOPES)
         else:
@@ -94,7 +153,7 @@ class OAuthHandler:
                 'uid': getattr(oauth_result, 'user_id', ''),
             }
         except Exception as e:
-            logger.error(f"Token exchange failed: {e}")
+            logger.error("Token exchange failed: %s", e)
             raise exceptions.AuthorizationError("Failed to exchange authorization code for token") from e
     
     def get_authorization_url(self) -> str:
@@ -109,10 +168,10 @@ class OAuthHandler:
         try:
             flow = self._get_auth_flow()
             auth_url = flow.start()
-            logger.debug(f"Generated authorization URL: {auth_url}")
+            logger.debug("Generated authorization URL: %s", auth_url)
             return auth_url
         except Exception as e:
-            logger.error(f"Failed to get authorization URL: {e}")
+            logger.error("Failed to get authorization URL: %s", e)
             raise exceptions.AuthenticationError(f"Failed to generate authorization URL: {e}") from e
     
     def finish_authorization(self, authorization_code: str) -> Dict[str, str]:
@@ -132,42 +191,40 @@ class OAuthHandler:
             # Exchange the authorization code for tokens
             token_data = self._exchange_code_for_token(authorization_code)
             
-            # Prepare the tokens for storage
-            tokens = {
-                'access_token': token_data['access_token'],
-                'refresh_token': token_data.get('refresh_token'),
-                'token_type': token_data.get('token_type', 'bearer'),
-                'account_id': token_data.get('account_id', ''),
-                'uid': token_data.get('uid', ''),
-                'created_at': int(datetime.utcnow().timestamp())
-            }
+            # Prepare the tokens for storage; _exchange_code_for_token has
+            # already filled in the defaults
+            now = int(time.time())
+            expires_in = token_data.pop('expires_in', None)
+            tokens = {**token_data, 'created_at': now}
             
             # Add expiration if available
-            if 'expires_in' in token_data and token_data['expires_in']:
-                expires_at = datetime.utcnow() + timedelta(seconds=token_data['expires_in'])
-                tokens['expires_at'] = int(expires_at.timestamp())
+            if expires_in:
+                tokens['expires_at'] = now + expires_in
             
             # Store the tokens
-            logger.info(f"Saving tokens to: {self.storage.token_path}")
+            logger.info("Saving tokens to: %s", self.storage.token_path)
+            # save_tokens writes atomically, so a successful save needs no read-back
             if not self.storage.save_tokens(tokens):
                 logger.error("Failed to save tokens")
                 raise exceptions.TokenStorageError("Failed to store tokens")
-            
-            # Verify the tokens were saved
-            if not self.storage.load_tokens():
-                logger.error("Tokens were not saved correctly")
-                raise exceptions.TokenStorageError("Failed to verify token storage")
                 
             logger.info("Successfully saved tokens")
+            self._cache_tokens(tokens)
+            return tokens
             
         except Exception as e:
-            logger.error(f"Authorization error: {str(e)}", exc_info=True)
+            logger.error("Authorization error: %s", e, exc_info=True)
             raise exceptions.AuthorizationError(f"Authorization failed: {str(e)}") from e
     
-    @log_execution_time(logger)
-    def get_authenticated_client(self) -> 'Dropbox':
+    def get_authenticated_client(
+        self, tokens: Optional[Dict[str, Optional[Union[str, int]]]] = None
+    ) -> 'Dropbox':
         """Get an authenticated Dropbox client.
         
+        Args:
+            tokens: Valid tokens already obtained from get_valid_tokens(). If not
+                provided, they are loaded (and refreshed if needed) here.
+        
         Returns:
             An authenticated Dropbox client instance
             
@@ -175,23 +232,34 @@ class OAuthHandler:
             exceptions.AuthenticationError: If authentication fails
         """
         logger.debug("Getting authenticated Dropbox client")
-        tokens = self.get_valid_tokens()
+        if tokens is None:
+            tokens = self.get_valid_tokens()
         
         if not tokens:
             error_msg = "No tokens available for authentication"
-            logger.error(f"{error_msg}: {self.storage.token_path}")
+            logger.error("%s: %s", error_msg, self.storage.token_path)
             raise exceptions.AuthenticationError(error_msg)
             
         if 'access_token' not in tokens:
             error_msg = "No access token in the token data"
-            logger.error(f"{error_msg}: {self.storage.token_path}")
+            logger.error("%s: %s", error_msg, self.storage.token_path)
             raise exceptions.AuthenticationError(error_msg)
         
+        access_token = tokens['access_token']
+        if self._client is not None and self._client_token == access_token:
+            logger.debug("Reusing Dropbox client for current access token")
+            return self._client
+        
+        from dropbox import Dropbox
+        
         logger.debug("Creating Dropbox client with access token")
         client = Dropbox(
-            oauth2_access_token=tokens['access_token'],
-            user_agent=f"RSS-to-Kobo/{getattr(config, '__version__', 'unknown')}"
+            oauth2_access_token=access_token,
+            user_agent=_USER_AGENT,
+            session=self._get_session(),
         )
+        self._client = client
+        self._client_token = access_token
         
         logger.debug("Successfully created authenticated Dropbox client")
         return client
@@ -199,30 +267,44 @@ class OAuthHandler:
     def get_valid_tokens(self) -> Optional[Dict[str, Optional[Union[str, int]]]]:
         """Get valid tokens, refreshing if necessary.
         
+        Concurrent callers for the same user share one refresh: the first
+        caller refreshes while the others wait and reuse its result.
+        
         Returns:
-{{ ... }}
+            Dictionary of valid tokens, or None if no usable tokens are stored
             
         Raises:
             exceptions.TokenRefreshError: If token refresh fails
         """
-        tokens = self.storage.load_tokens()
-        if not tokens:
-            return None
+        cached = self._get_cached_tokens()
+        if cached and not self._is_token_expired(cached):
+            return cached
+        
+        with self._get_refresh_lock():
+            # Another caller may have refreshed while we were waiting
+            cached = self._get_cached_tokens()
+            if cached and not self._is_token_expired(cached):
+                return cached
             
-        # Check if token is expired or about to expire
-        if self._is_token_expired(tokens):
-            if 'refresh_token' not in tokens:
-                logger.warning("Token expired and no refresh token available")
+            tokens = self.storage.load_tokens()
+            if not tokens:
                 return None
                 
-            logger.info("Access token expired, attempting to refresh...")
-            try:
-                tokens = self.refresh_tokens(tokens['refresh_token'])
-            except exceptions.TokenRefreshError as e:
-                logger.error(f"Failed to refresh token: {e}")
-                raise
-                
-        return tokens
+            # Check if token is expired or about to expire
+            if self._is_token_expired(tokens):
+                if 'refresh_token' not in tokens:
+                    logger.warning("Token expired and no refresh token available")
+                    return None
+                    
+                logger.info("Access token expired, attempting to refresh...")
+                try:
+                    tokens = self.refresh_tokens(tokens['refresh_token'])
+                except exceptions.TokenRefreshError as e:
+                    logger.error("Failed to refresh token: %s", e)
+                    raise
+            
+            self._cache_tokens(tokens)
+            return tokens
     
     @log_execution_time(logger)
     def refresh_tokens(self, refresh_token: str) -> Dict[str, Optional[Union[str, int]]]:
@@ -239,6 +321,8 @@ class OAuthHandler:
         """
         logger.info("Attempting to refresh access token")
         try:
+            from dropbox import Dropbox
+            
             oauth_config = config.get_oauth_config()
             logger.debug("Using OAuth config with app key: %s", 
                         oauth_config['app_key'][:4] + '...' + oauth_config['app_key'][-2:] 
@@ -250,6 +334,7 @@ class OAuthHandler:
                 oauth2_refresh_token=refresh_token,
                 app_key=oauth_config['app_key'],
                 app_secret=oauth_config['app_secret'],
+                session=self._get_session(),
             )
             
             # This will automatically refresh the token if needed
@@ -265,7 +350,7 @@ class OAuthHandler:
                 'access_token': oauth2_access_token,
                 'refresh_token': refresh_token,  # Refresh token remains the same
                 'token_type': 'bearer',
-                'refreshed_at': int(datetime.utcnow().timestamp())
+                'refreshed_at': int(time.time())
             }
             
             # Store the new tokens
@@ -279,7 +364,7 @@ class OAuthHandler:
             return tokens
             
         except Exception as e:
-            logger.error(f"Token refresh failed: {e}")
+            logger.error("Token refresh failed: %s", e)
             raise exceptions.TokenRefreshError("Failed to refresh access token") from e
     
     def _is_token_expired(self, tokens: Dict[str, Any]) -> bool:
@@ -295,10 +380,8 @@ class OAuthHandler:
             # If we don't have an expiration, assume it's a long-lived token
             return False
             
-        expiry_buffer = config.get_oauth_config().get('token_expiry_buffer', DEFAULT_TOKEN_EXPIRY_BUFFER)
-        expiry_time = tokens['expires_at'] - expiry_buffer
-        
-        return datetime.utcnow().timestamp() >= expiry_time
+        # A fixed buffer: expiry checks must not require the app credentials
+        return time.time() >= tokens['expires_at'] - DEFAULT_TOKEN_EXPIRY_BUFFER
     
     @log_execution_time(logger)
     def is_authenticated(self) -> bool:
@@ -319,7 +402,7 @@ class OAuthHandler:
                 
             logger.debug("Tokens found, verifying with Dropbox API")
             # Verify the token works by making a simple API call
-            client = self.get_authenticated_client()
+            client = self.get_authenticated_client(tokens)
             account = client.users_get_current_account()
             
             # Log successful authentication
@@ -345,9 +428,10 @@ class OAuthHandler:
             bool: True if logout was successful, False otherwise
         """
         try:
-            if hasattr(self, '_client'):
-                self._client = None
-            return self.storage.delete_tokens()
+            self._client = None
+            self._client_token = None
+            self._cached_tokens.pop(self.username, None)
+            return self.storage.clear_tokens()
         except Exception as e:
-            logger.error(f"Logout failed: {e}")
+            logger.error("Logout failed: %s", e)
             return False
@@ -1,20 +1,24 @@
 """
 Secure storage for OAuth tokens using encryption.
 """
+import hashlib
 import json
 import logging
 import os
+import time
 from base64 import b64decode, b64encode
-from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 from cryptography.fernet import Fernet, InvalidToken
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
-from .config import get_token_path
+try:
+    import orjson
+except ImportError:  # optional: faster parsing of the decrypted tokens
+    orjson = None
+
+from .config import get_env_variable, get_token_path
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +31,26 @@ KEY_LENGTH = 32
 # Use a fixed salt for development to ensure consistent key generation
 DEV_SALT = b'rss2kobo_salt_123'  # Fixed salt for development
 
+# Fernet instances shared across storages, keyed by a digest of the password
+_FERNETS: Dict[bytes, Fernet] = {}
+
+@lru_cache(maxsize=32)
+def _derive_key(password: str, salt: bytes) -> bytes:
+    """Run the key derivation, cached per (password, salt) for the process.
+    
+    Uses hashlib's PBKDF2-HMAC-SHA256, which runs inside OpenSSL and can use
+    the CPU's SHA extensions.
+    """
+    key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, ITERATIONS, KEY_LENGTH)
+    return b64encode(key)
+
+
 def generate_key_from_password(password: str, salt: Optional[bytes] = None) -> tuple[bytes, bytes]:
     """Generate a cryptographic key from a password and optional salt.
     
+    Derived keys are cached, so repeated calls with the same password and
+    salt only pay for the key derivation once per process.
+    
     Args:
         password: The password to derive the key from
         salt: Optional salt. If None, uses a development salt.
@@ -37,15 +58,7 @@ def generate_key_from_password(password: str, salt: Optional[bytes] = None) -> t
     if salt is None:
         salt = DEV_SALT  # Use fixed salt for development
     
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=KEY_LENGTH,
-        salt=salt,
-        iterations=ITERATIONS,
-        backend=default_backend()
-    )
-    key = kdf.derive(password.encode())
-    return b64encode(key), salt
+    return _derive_key(password, salt), salt
 
 
 class SecureTokenStorage:
@@ -65,55 +78,65 @@ class SecureTokenStorage:
         """
         self.token_path = get_token_path(username)
         # Get password from parameter, then environment, then use default
-        self.password = password or os.getenv('TOKEN_ENCRYPTION_KEY') or "dev-key-1234567890"
+        self.password = password or get_env_variable('TOKEN_ENCRYPTION_KEY', '') or "dev-key-1234567890"
         self._fernet = None
-        logger.debug(f"Initialized SecureTokenStorage for {username}, using {'custom' if password else 'default'} encryption")
+        logger.debug("Initialized SecureTokenStorage for %s, using %s encryption",
+                     username, 'custom' if password else 'default')
         
         # Ensure token directory exists and has correct permissions
         try:
             self.token_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
         except Exception as e:
-            logger.warning(f"Could not set directory permissions: {e}")
+            logger.warning("Could not set directory permissions: %s", e)
             # Try without setting permissions if we can't set them
             self.token_path.parent.mkdir(parents=True, exist_ok=True)
         
     def _get_fernet(self) -> Fernet:
         """Get a Fernet instance for encryption/decryption."""
         if self._fernet is None:
-            # Derive key from password
-            key, _ = generate_key_from_password(self.password)
-            self._fernet = Fernet(key)
+            cache_key = hashlib.blake2b(self.password.encode(), digest_size=16).digest()
+            fernet = _FERNETS.get(cache_key)
+            if fernet is None:
+                # Derive key from password
+                key, _ = generate_key_from_password(self.password)
+                fernet = _FERNETS[cache_key] = Fernet(key)
+            self._fernet = fernet
         return self._fernet
     
     def load_tokens(self) -> Optional[Dict[str, Any]]:
         """Load and decrypt tokens from storage."""
-        if not self.token_path.exists():
-            logger.debug(f"Token file not found: {self.token_path}")
+        # A single stat rejects missing and empty files without opening them
+        try:
+            size = os.stat(self.token_path).st_size
+        except FileNotFoundError:
+            logger.debug("Token file not found: %s", self.token_path)
+            return None
+        except OSError:
+            return None
+            
+        if size == 0:
+            logger.error("Token file is empty: %s", self.token_path)
             return None
             
         try:
-            logger.debug(f"Loading tokens from {self.token_path}")
+            logger.debug("Loading tokens from %s", self.token_path)
             with open(self.token_path, 'rb') as f:
-                encrypted_data = f.read()
-            
-            if not encrypted_data:
-                logger.error(f"Token file is empty: {self.token_path}")
-                return None
+                encrypted_data = f.read(size)
                 
             # Decrypt the data
             fernet = self._get_fernet()
             try:
                 decrypted_data = fernet.decrypt(encrypted_data)
             except InvalidToken as e:
-                logger.error(f"Failed to decrypt token file (invalid token): {e}")
+                logger.error("Failed to decrypt token file (invalid token): %s", e)
                 return None
             
             try:
-                tokens = json.loads(decrypted_data.decode('utf-8'))
-                logger.debug(f"Successfully loaded tokens for {self.token_path.name}")
+                tokens = orjson.loads(decrypted_data) if orjson else json.loads(decrypted_data)
+                logger.debug("Successfully loaded tokens for %s", self.token_path.name)
                 return tokens
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse token file (invalid JSON): {e}")
+            except ValueError as e:
+                logger.error("Failed to parse token file (invalid JSON): %s", e)
                 return None
             
         except Exception as e:
@@ -122,38 +145,31 @@ class SecureTokenStorage:
     def save_tokens(self, tokens: Dict[str, Any]) -> bool:
         """Encrypt and save tokens to storage."""
         try:
-            # Ensure the directory exists with secure permissions
-            self.token_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
-            
             # Add timestamp
-            tokens['_saved_at'] = datetime.utcnow().isoformat()
+            tokens['_saved_at'] = int(time.time())
             
             # Serialize and encrypt the tokens
-            json_data = json.dumps(tokens, indent=2).encode('utf-8')
+            json_data = json.dumps(tokens, separators=(',', ':')).encode('utf-8')
             fernet = self._get_fernet()
             encrypted_data = fernet.encrypt(json_data)
             
-            # Write to file atomically
+            # Write to a temp file with owner-only permissions (0o600), then
+            # atomically swap it into place. The mode passed to os.open only
+            # applies on creation, so reset it in case a stale temp file from
+            # an interrupted save is being reused.
             temp_path = f"{self.token_path}.tmp"
-            with open(temp_path, 'wb') as f:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            if hasattr(os, 'fchmod'):  # not available on Windows
+                os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'wb') as f:
                 f.write(encrypted_data)
+            os.replace(temp_path, self.token_path)
             
-            # On Windows, we need to remove the destination file first if it exists
-            if os.path.exists(self.token_path):
-                os.unlink(self.token_path)
-            os.rename(temp_path, self.token_path)
-            
-            # Set secure file permissions (0o600 = owner read/write only)
-            try:
-                os.chmod(self.token_path, 0o600)
-            except OSError as e:
-                logger.warning(f"Could not set file permissions: {e}")
-            
-            logger.info(f"Tokens saved to {self.token_path}")
+            logger.info("Tokens saved to %s", self.token_path)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to save tokens: {e}", exc_info=True)
+            logger.error("Failed to save tokens: %s", e, exc_info=True)
             # Clean up temp file if it exists
             if 'temp_path' in locals() and os.path.exists(temp_path):
                 try:
@@ -165,10 +181,8 @@ class SecureTokenStorage:
     def clear_tokens(self) -> bool:
         """Remove stored tokens."""
         try:
-            if self.token_path.exists():
-                os.unlink(self.token_path)
-                self.token_path.unlink()
+            self.token_path.unlink(missing_ok=True)
             return True
         except OSError as e:
-            logger.error(f"Failed to clear tokens: {e}")
+            logger.error("Failed to clear tokens: %s", e)
             return False
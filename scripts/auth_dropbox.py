@@ -15,7 +15,6 @@ from typing import Optional, Dict, Any, List, Union, Tuple, cast
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from scripts.auth import run_oauth_flow, check_auth, logout_user
 from scripts.auth.exceptions import AuthenticationError, TokenStorageError, OAuthError
 
 # Configure logging
@@ -80,6 +79,7 @@ def main():
             print("A browser window will open for you to authorize the application.")
             print("If the browser doesn't open, you'll be provided with a URL to visit manually.\n")
             
+            from scripts.auth.cli import run_oauth_flow
             success = run_oauth_flow(args.username)
             if success:
                 print("\n✅ Successfully authenticated with Dropbox!")
@@ -91,6 +91,7 @@ def main():
                 
         elif args.command == 'check':
             print(f"Checking authentication status for user: {args.username}")
+            from scripts.auth.cli import check_auth
             is_authenticated = check_auth(args.username)
             if is_authenticated:
                 print("✅ User is authenticated with Dropbox.")
@@ -102,6 +103,7 @@ def main():
                 
         elif args.command == 'logout':
             print(f"Logging out user: {args.username}")
+            from scripts.auth.cli import logout_user
             success = logout_user(args.username)
             if success:
                 print("✅ Successfully logged out. Tokens have been removed.")
@@ -167,12 +169,14 @@ def main() -> int:
             print_header()
             print(f"Initiating Dropbox authentication for user: {args.username}")
             print("Please follow the instructions in your browser...\n")
+            from scripts.auth.cli import run_oauth_flow
             run_oauth_flow(args.username)
             print("\n✅ Authentication successful! You can now use the RSS to Kobo service.")
             return 0
             
         elif args.command == 'logout':
             print_header()
+            from scripts.auth.cli import logout_user
             if logout_user(args.username):
                 print(f"✅ Successfully logged out user: {args.username}")
                 return 0
@@ -181,6 +185,7 @@ def main() -> int:
             
         elif args.command == 'status':
             print_header()
+            from scripts.auth.cli import check_auth
             status = check_auth(args.username)
             if status['authenticated']:
                 print(f"✅ User {args.username} is authenticated with Dropbox")
@@ -2,25 +2,161 @@
 EPUB generation module for RSS to Kobo.
 """
 
+import io
 import logging
-from datetime import datetime
+import zipfile
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from bs4 import BeautifulSoup
-from ebooklib import epub
+try:
+    from markupsafe import escape
+except ImportError:  # optional: markupsafe's escape has a C speedup
+    from html import escape
 
-from .utils import format_date, get_output_path
+from .utils import format_date, format_dates, get_output_path
 from .utils.logging_utils import setup_logger
 
 logger = setup_logger(__name__)
 
+# Markup for one article in a feed chapter
+_ARTICLE_TMPL = '<h2>{title}</h2>\n{meta}{body}\n<hr/>'
+_META_TMPL = '<div class="article-meta">{}</div>\n'
+
+# Static archive entries, encoded once at import time
+_MIMETYPE = b"application/epub+zip"
+
+_DEFAULT_CSS_BYTES = b"""
+body {
+    font-family: Arial, sans-serif;
+    line-height: 1.6;
+    margin: 2em;
+}
+h1 { font-size: 1.8em; }
+h2 { font-size: 1.4em; }
+h3 { font-size: 1.2em; }
+.article-meta {
+    color: #666;
+    font-style: italic;
+    margin-bottom: 1em;
+}
+"""
+
+_CONTAINER_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+# Templates for the per-book documents; the NCX is kept for older reading systems
+_CHAPTER_HEAD_TMPL = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" lang="{lang}" xml:lang="{lang}">
+<head>
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="styles/default.css"/>
+</head>
+"""
+_CHAPTER_TAIL = b"""
+</html>
+"""
+
+_OPF_TMPL = """<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id" xml:lang="{lang}">
+<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:identifier id="id">{identifier}</dc:identifier>
+<dc:title>{title}</dc:title>
+<dc:language>{lang}</dc:language>
+<dc:creator>{author}</dc:creator>
+<dc:date>{date}</dc:date>
+{description}<meta property="dcterms:modified">{modified}</meta>
+</metadata>
+<manifest>
+<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
+<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+<item id="style_default" href="styles/default.css" media-type="text/css"/>
+{manifest}
+</manifest>
+<spine toc="ncx">
+<itemref idref="nav"/>
+{spine}
+</spine>
+</package>
+"""
+
+_NCX_TMPL = """<?xml version="1.0" encoding="utf-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+<head>
+<meta name="dtb:uid" content="{identifier}"/>
+<meta name="dtb:depth" content="1"/>
+<meta name="dtb:totalPageCount" content="0"/>
+<meta name="dtb:maxPageNumber" content="0"/>
+</head>
+<docTitle><text>{title}</text></docTitle>
+<navMap>
+{nav_points}
+</navMap>
+</ncx>
+"""
+
+_NAV_TMPL = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="{lang}" xml:lang="{lang}">
+<head>
+<title>{title}</title>
+</head>
+<body>
+<nav epub:type="toc" id="id">
+<h2>{title}</h2>
+<ol>
+{entries}
+</ol>
+</nav>
+</body>
+</html>
+"""
+
+# Per-chapter lines of the package documents; only the index, file name and
+# title vary, so the OPF/NCX/nav bodies are plain joins over these.
+_MANIFEST_ITEM = '<item id="feed_{i}" href="{href}" media-type="application/xhtml+xml"/>'
+_SPINE_ITEM = '<itemref idref="feed_{i}"/>'
+_NAV_POINT = (
+    '<navPoint id="feed_{i}" playOrder="{order}"><navLabel><text>{title}</text>'
+    '</navLabel><content src="{href}"/></navPoint>'
+)
+_NAV_ENTRY = '<li><a href="{href}">{title}</a></li>'
+
+
+def _to_xhtml_body(markup: str) -> bytes:
+    """Parse HTML markup and serialize it as a well-formed, UTF-8 XHTML body."""
+    import lxml.html
+    from lxml import etree
+
+    document = lxml.html.document_fromstring(markup)
+    return etree.tostring(document.body, encoding="utf-8", method="xml")
+
+
+def _article_meta(published: Optional[str], author: Optional[str]) -> str:
+    """Build the metadata line shown under an article title.
+
+    ``published`` is the already formatted publication date, if any.
+    """
+    parts = []
+    if published:
+        parts.append(f'Published: {escape(published)}')
+    if author:
+        parts.append(f'By: {escape(author)}')
+    return _META_TMPL.format(" | ".join(parts)) if parts else ""
+
 
 class EPUBCreator:
     """Class to handle EPUB creation from RSS feed items."""
 
     def __init__(self, user: str, title: str = "Daily RSS Digest", 
-                 author: str = "RSS to Kobo", language: str = "en") -> None:
+                 author: str = "RSS to Kobo", language: str = "en",
+                 compress: bool = False) -> None:
         """Initialize the EPUB creator.
 
         Args:
@@ -28,62 +164,23 @@ class EPUBCreator:
             title: Base title for the EPUB
             author: Author name for the EPUB
             language: Language code for the EPUB
+            compress: Whether to deflate the archive entries
         """
         self.user = user
         self.title = f"{title} - {format_date()}"
         self.author = author
         self.language = language
-        self.book: Optional[epub.EpubBook] = None
-        self.chapters: List[epub.EpubHtml] = []
-
-    def _init_book(self) -> None:
-        """Initialize the EPUB book with metadata."""
-        if self.book is not None:
-            return
-            
-        self.book = epub.EpubBook()
-        
-        # Set basic metadata
-        self.book.set_identifier(f"rss-digest-{datetime.now().strftime('%Y%m%d%H%M%S')}")
-        self.book.set_title(self.title)
-        self.book.set_language(self.language)
-        self.book.add_author(self.author)
-        
-        # Add creation date
-        self.book.add_metadata('DC', 'date', datetime.now().strftime('%Y-%m-%dT%H:%M:%S'))
-        
-        # Add default CSS
-        self._add_default_styling()
-
-    def _add_default_styling(self) -> None:
-        """Add default CSS styling for the EPUB."""
-        css = """
-        body {
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            margin: 2em;
-        }
-        h1 { font-size: 1.8em; }
-        h2 { font-size: 1.4em; }
-        h3 { font-size: 1.2em; }
-        .article-meta {
-            color: #666;
-            font-style: italic;
-            margin-bottom: 1em;
-        }
-        """
-        style = epub.EpubItem(
-            uid="style_default",
-            file_name="styles/default.css",
-            media_type="text/css",
-            content=css,
-        )
-        if self.book:
-            self.book.add_item(style)
+        self.compress = compress
+        self.description: Optional[str] = None
+        self.created = datetime.now()
+        self.identifier = f"rss-digest-{self.created.strftime('%Y%m%d%H%M%S')}"
+        # (title, file name, encoded XHTML document) for each feed chapter
+        self.chapters: List[Tuple[str, str, bytes]] = []
+        self.size_bytes: Optional[int] = None
 
     def _create_chapter(
         self, feed_name: str, articles: List[Dict[str, Any]]
-    ) -> epub.EpubHtml:
+    ) -> Tuple[str, str, bytes]:
         """Create a chapter for a feed.
 
         Args:
@@ -91,35 +188,38 @@ class EPUBCreator:
             articles: List of articles in the feed
 
         Returns:
-            EpubHtml chapter
+            Tuple of (chapter title, file name, UTF-8 encoded XHTML document)
         """
-        # Create chapter
-        chapter = epub.EpubHtml(
-            title=feed_name,
-            file_name=f"feed_{len(self.chapters)}.xhtml",
-            lang="en",
-        )
+        file_name = f"feed_{len(self.chapters)}.xhtml"
 
         # Add chapter content
-        content = [f"<h1>{feed_name}</h1>"]
-
-        for article in articles:
-            # Add article title and metadata
-            content.append(f'<h2>{article["title"]}</h2>')
-            meta = []
-            if "published" in article:
-                meta.append(f'Published: {format_date(article["published"])}')
-            if "author" in article:
-                meta.append(f'By: {article["author"]}')
-            if meta:
-                content.append(f'<div class="article-meta">{" | ".join(meta)}</div>')
-
-            # Add article content
-            content.append(article.get("content", "<p>No content available</p>"))
-            content.append("<hr/>")
-
-        chapter.content = "\n".join(content)
-        return chapter
+        buf = io.StringIO()
+        w = buf.write
+        title = escape(feed_name)
+        w(f"<h1>{title}</h1>")
+
+        published = [article.get("published") for article in articles]
+        for article, date, display_date in zip(articles, published, format_dates(published)):
+            get = article.get
+            w("\n")
+            w(_ARTICLE_TMPL.format(
+                title=escape(get("title", "Untitled")),
+                meta=_article_meta(display_date if date else None, get("author")),
+                body=get("content") or "<p>No content available</p>",
+            ))
+
+        # lxml serializes the body straight to UTF-8, so the document is
+        # assembled as bytes without a full str round trip
+        head = _CHAPTER_HEAD_TMPL.format(lang=self.language, title=title)
+        document = b"".join((head.encode("utf-8"), _to_xhtml_body(buf.getvalue()), _CHAPTER_TAIL))
+
+        if logger.isEnabledFor(logging.DEBUG):
+            from lxml import etree
+            try:
+                etree.fromstring(document)
+            except etree.XMLSyntaxError as e:
+                logger.debug("Chapter %s is not well-formed XHTML: %s", file_name, e)
+        return feed_name, file_name, document
 
     def add_feed(self, feed_name: str, articles: List[Dict[str, Any]]) -> None:
         """Add a feed's articles to the EPUB.
@@ -128,17 +228,56 @@ class EPUBCreator:
             feed_name: Name of the feed
             articles: List of articles in the feed
         """
-        if not self.book:
-            self._init_book()
+        self.chapters.append(self._create_chapter(feed_name, articles))
+
+    def _package_files(self) -> Tuple[str, str, str]:
+        """Build the OPF package, NCX and navigation documents.
 
-        chapter = self._create_chapter(feed_name, articles)
-        if self.book:
-            self.book.add_item(chapter)
-            self.chapters.append(chapter)
+        Returns:
+            Tuple of (content.opf, toc.ncx, nav.xhtml) contents
+        """
+        chapters = [
+            (i, file_name, escape(title))
+            for i, (title, file_name, _) in enumerate(self.chapters)
+        ]
+        manifest = "\n".join(_MANIFEST_ITEM.format(i=i, href=href) for i, href, _ in chapters)
+        spine = "\n".join(_SPINE_ITEM.format(i=i) for i, _, _ in chapters)
+        nav_points = "\n".join(
+            _NAV_POINT.format(i=i, order=i + 1, href=href, title=title)
+            for i, href, title in chapters
+        )
+        entries = "\n".join(_NAV_ENTRY.format(href=href, title=title) for _, href, title in chapters)
+
+        title = escape(self.title)
+        description = (
+            f"<dc:description>{escape(self.description)}</dc:description>\n"
+            if self.description else ""
+        )
+        opf = _OPF_TMPL.format(
+            lang=self.language,
+            identifier=self.identifier,
+            title=title,
+            author=escape(self.author),
+            date=self.created.strftime('%Y-%m-%dT%H:%M:%S'),
+            description=description,
+            modified=datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            manifest=manifest,
+            spine=spine,
+        )
+        ncx = _NCX_TMPL.format(
+            identifier=self.identifier, title=title, nav_points=nav_points
+        )
+        nav = _NAV_TMPL.format(lang=self.language, title=title, entries=entries)
+        return opf, ncx, nav
 
     def generate(self) -> Path:
         """Generate the EPUB file.
 
+        The archive is written directly with zipfile, one entry at a time, in
+        the order a reading system opens them: mimetype, container, package
+        documents, stylesheet, then chapters in spine order. Each chapter's
+        markup is released as soon as it has been written.
+
         Returns:
             Path to the generated EPUB file
 
@@ -146,25 +285,35 @@ class EPUBCreator:
             ValueError: If no content is available to generate EPUB
             Exception: If there's an error during EPUB generation
         """
-        if not self.book or not self.chapters:
+        if not self.chapters:
             raise ValueError("No content to generate EPUB")
 
-        # Create table of contents
-        self.book.toc = [(chapter, []) for chapter in self.chapters]
-
-        # Add navigation
-        self.book.add_item(epub.EpubNcx())
-        self.book.add_item(epub.EpubNav())
-
-        # Define spine (order of content)
-        self.book.spine = ["nav"] + self.chapters
-
         # Generate output path
         output_path = get_output_path(self.user)
 
-        # Write the EPUB file
+        # Write the EPUB file, noting its size from the open handle
         try:
-            epub.write_epub(str(output_path), self.book, {})
+            with open(output_path, "wb") as f:
+                compression = zipfile.ZIP_DEFLATED if self.compress else zipfile.ZIP_STORED
+                # EPUBs are far below the ZIP64 limits, so never emit its extensions
+                with zipfile.ZipFile(f, "w", compression=compression,
+                                     compresslevel=6 if self.compress else None,
+                                     allowZip64=False) as zf:
+                    # The mimetype entry must come first and be stored uncompressed
+                    zf.writestr("mimetype", _MIMETYPE,
+                                compress_type=zipfile.ZIP_STORED)
+                    zf.writestr("META-INF/container.xml", _CONTAINER_XML)
+
+                    opf, ncx, nav = self._package_files()
+                    zf.writestr("OEBPS/content.opf", opf)
+                    zf.writestr("OEBPS/toc.ncx", ncx)
+                    zf.writestr("OEBPS/nav.xhtml", nav)
+                    zf.writestr("OEBPS/styles/default.css", _DEFAULT_CSS_BYTES)
+
+                    for i, (title, file_name, document) in enumerate(self.chapters):
+                        zf.writestr(f"OEBPS/{file_name}", document)
+                        self.chapters[i] = (title, file_name, b"")
+                self.size_bytes = f.tell()
             logger.info("Generated EPUB: %s", output_path)
             return output_path
         except Exception as e:
@@ -176,20 +325,73 @@ def build_epub(
     user: str, 
     feeds_data: Dict[str, List[Dict[str, Any]]],
     output_path: Optional[Path] = None,
-    config: Optional[Dict[str, Any]] = None
+    config: Optional[Dict[str, Any]] = None,
+    compress: Optional[bool] = None
 ) -> Path:
     """
     Build an EPUB from feed data.
 
+    By default the archive entries are stored uncompressed: the file is
+    larger, but writing it skips DEFLATE and the e-reader opens pages
+    without decompressing them, which suits an EPUB delivered to a Kobo and
+    read locally. Enable compression to favour a smaller download instead.
+
     Args:
         user: Username for the EPUB
         feeds_data: Dictionary mapping feed names to lists of articles
         output_path: Optional path to save the EPUB file
         config: Optional configuration dictionary
+        compress: Whether to deflate the archive. Defaults to the
+            ``output.compress`` config setting, or False.
 
     Returns:
         Path to the generated EPUB file
         
+    Raises:
+        ValueError: If there's an error building the EPUB
+    """
+    return build_epub_with_size(user, feeds_data, output_path, config, compress)[0]
+
+
+def build_epub_with_size(
+    user: str, 
+    feeds_data: Dict[str, List[Dict[str, Any]]],
+    output_path: Optional[Path] = None,
+    config: Optional[Dict[str, Any]] = None,
+    compress: Optional[bool] = None
+) -> Tuple[Path, int]:
+    """
+    Build an EPUB from feed data and report the size of the written file.
+
+    Takes the same arguments as :func:`build_epub`.
+
+    Returns:
+        Tuple of (path to the generated EPUB file, file size in bytes)
+        
+    Raises:
+        ValueError: If there's an error building the EPUB
+    """
+    return build_epub_from_stream(user, feeds_data.items(), output_path, config, compress)
+
+
+def build_epub_from_stream(
+    user: str, 
+    feeds: Iterable[Tuple[str, List[Dict[str, Any]]]],
+    output_path: Optional[Path] = None,
+    config: Optional[Dict[str, Any]] = None,
+    compress: Optional[bool] = None
+) -> Tuple[Path, int]:
+    """
+    Build an EPUB from (feed name, articles) pairs as they arrive.
+
+    Each feed is rendered into a chapter as soon as the iterable yields it,
+    so a producer can keep fetching while earlier feeds are being built.
+    Chapters follow the order in which feeds are yielded. Otherwise takes
+    the same arguments as :func:`build_epub`.
+
+    Returns:
+        Tuple of (path to the generated EPUB file, file size in bytes)
+        
     Raises:
         ValueError: If there's an error building the EPUB
     """
@@ -213,21 +415,24 @@ def build_epub(
         title = output_config.get('title', 'Daily RSS Digest')
         author = output_config.get('author', 'RSS to Kobo')
         language = output_config.get('language', 'en')
+        if compress is None:
+            compress = bool(output_config.get('compress', False))
         
         # Create EPUB
         creator = EPUBCreator(
             user=user,
             title=title,
             author=author,
-            language=language
+            language=language,
+            compress=compress
         )
         
         # Add description if available
         if 'description' in output_config:
-            creator.book.add_metadata('DC', 'description', output_config['description'])
+            creator.description = output_config['description']
         
         # Add all feeds and their articles
-        for feed_name, articles in feeds_data.items():
+        for feed_name, articles in feeds:
             if not articles:
                 logger.warning("No articles found for feed: %s", feed_name)
                 continue
@@ -241,7 +446,8 @@ def build_epub(
                 continue
         
         # Save the EPUB
-        return creator.generate()
+        path = creator.generate()
+        return path, creator.size_bytes
         
     except Exception as e:
         error_msg = f"Error building EPUB: {e}"
@@ -3,22 +3,180 @@ Fetch RSS feeds and build EPUB for Kobo.
 """
 
 import argparse
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import queue
+import shelve
 import sys
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from html import escape, unescape
+from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
-import feedparser
-from bs4 import BeautifulSoup
+import requests
+from lxml import etree
 
+try:
+    import orjson
+except ImportError:  # optional: faster (de)serialization of the feed cache
+    orjson = None
+
+from . import __version__
 from .epub_builder import build_epub
 from .utils import clean_html, load_feeds_config
 from .utils.logging_utils import setup_logger
 
 logger = setup_logger(__name__)
 
+# Upper bound on feeds fetched concurrently
+MAX_FETCH_WORKERS = 16
+
+# Minimum delay in seconds between requests to the same host
+HOST_FETCH_INTERVAL = 1.0
+
+# Feeds with at least this many entries have their HTML cleaned in worker processes
+CLEAN_PARALLEL_THRESHOLD = 16
+
+# Plain-text content shorter than this is escaped instead of run through the cleaner
+SHORT_CONTENT_LENGTH = 32
+
+# Timeout in seconds for downloading a feed
+FEED_TIMEOUT = 30
+
+_USER_AGENT = f"RSS-to-Kobo/{__version__}"
+
+# Directory for data cached between runs
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "rss-to-kobo"
+
+# Cleaned articles kept between runs; least recently used ones are evicted
+ARTICLE_CACHE_MAX_ENTRIES = 5000
+
+# XML namespaces used by RSS 1.0/2.0 and Atom feeds
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_RSS1 = "{http://purl.org/rss/1.0/}"
+_DC = "{http://purl.org/dc/elements/1.1/}"
+_CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+
+# Elements holding one feed entry
+_ENTRY_TAGS = ("item", f"{_RSS1}item", f"{_ATOM}entry")
+
+# Candidate child elements for each article field, in order of preference.
+# Content falls back from full content to summary, like feedparser did.
+_FIELD_TAGS = {
+    "title": ("title", f"{_RSS1}title", f"{_ATOM}title", f"{_DC}title"),
+    "link": ("link", f"{_RSS1}link"),
+    "published": ("pubDate", f"{_ATOM}published", f"{_ATOM}updated", f"{_DC}date"),
+    "author": ("author", f"{_DC}creator"),
+    "id": ("guid", f"{_ATOM}id"),
+    "content": (f"{_CONTENT}encoded", f"{_ATOM}content", f"{_ATOM}summary",
+                "description", f"{_RSS1}description"),
+}
+
+
+def _element_text(elem: etree._Element) -> str:
+    """Get the text of an element, serializing any inline XHTML children."""
+    if len(elem):
+        return (elem.text or "") + "".join(
+            etree.tostring(child, encoding="unicode") for child in elem
+        )
+    return elem.text or ""
+
+
+def _atom_link(entry: etree._Element) -> str:
+    """Get the alternate link of an Atom entry."""
+    for link in entry.iterfind(f"{_ATOM}link"):
+        if link.get("rel", "alternate") == "alternate" and link.get("href"):
+            return link.get("href")
+    return ""
+
+
+def _atom_author(entry: etree._Element) -> str:
+    """Get the author name of an Atom entry."""
+    name = entry.find(f"{_ATOM}author/{_ATOM}name")
+    return (name.text or "") if name is not None else ""
+
+
+def _clean_trivial(content: str) -> Optional[str]:
+    """Clean empty or short plain-text content without parsing it.
+
+    Returns:
+        The cleaned content, or None if the content needs the HTML cleaner
+    """
+    text = content.strip()
+    if not text:
+        return ""
+    if len(text) < SHORT_CONTENT_LENGTH and "<" not in text and "&" not in text:
+        return f"<p>{escape(text)}</p>"
+    return None
+
+
+def parse_feed_entries(data: bytes, max_articles: int) -> List[Dict[str, str]]:
+    """Parse the first entries of an RSS or Atom document.
+
+    The document is parsed incrementally and parsing stops once
+    ``max_articles`` entries have been read, so large feeds cost no more than
+    the entries actually used.
+
+    Args:
+        data: Raw feed document
+        max_articles: Maximum number of entries to return
+
+    Returns:
+        List of entries with title, link, published, author and raw content
+
+    Raises:
+        lxml.etree.XMLSyntaxError: If the document is not well-formed
+    """
+    entries: List[Dict[str, str]] = []
+    if max_articles <= 0:
+        return entries
+
+    for _, elem in etree.iterparse(
+        BytesIO(data), events=("end",), tag=_ENTRY_TAGS,
+        resolve_entities=False, no_network=True,
+    ):
+        children: Dict[str, etree._Element] = {}
+        for child in elem:
+            if isinstance(child.tag, str):
+                children.setdefault(child.tag, child)
+
+        entry = {}
+        for field, tags in _FIELD_TAGS.items():
+            value = ""
+            for tag in tags:
+                child = children.get(tag)
+                if child is not None:
+                    value = _element_text(child).strip()
+                    if value:
+                        break
+            # Atom titles of type html hold escaped markup; titles are plain text
+            if field == "title" and value and child.get("type") == "html":
+                value = unescape(value)
+            entry[field] = value
+
+        if elem.tag == f"{_ATOM}entry":
+            entry["link"] = _atom_link(elem)
+            entry["author"] = _atom_author(elem)
+        entries.append(entry)
+
+        # Free the parsed entry and any earlier siblings
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+        if len(entries) >= max_articles:
+            break
+
+    return entries
+
 
 class FeedFetcher:
     """Handle fetching and processing of RSS feeds."""
@@ -28,6 +186,48 @@ class FeedFetcher:
         self.user = user
         self.feeds = self._load_feeds()
         self.config = self._load_config()
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = _USER_AGENT
+        # Earliest monotonic time the next request to each host may start
+        self._host_next_slot: Dict[str, float] = defaultdict(float)
+        self._host_slot_lock = threading.Lock()
+        # Worker processes for cleaning large feeds, created on first use
+        self._clean_pool: Optional[ProcessPoolExecutor] = None
+        self._clean_pool_lock = threading.Lock()
+        # Cleaned article HTML keyed by feed URL and entry GUID/link, opened on first use
+        self._article_cache: Optional[shelve.Shelf] = None
+        self._article_cache_lock = threading.Lock()
+        self._article_cache_path = CACHE_DIR / f"articles_{user}"
+        # Validators and articles from the last successful fetch of each feed
+        self._feed_cache_path = CACHE_DIR / f"feed_cache_{user}.json"
+        self._feed_cache: Dict[str, Dict[str, Any]] = self._load_feed_cache()
+
+    def _load_feed_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Load the HTTP validator cache from the previous run."""
+        try:
+            data = self._feed_cache_path.read_bytes()
+            cache = orjson.loads(data) if orjson else json.loads(data)
+            return cache if isinstance(cache, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable feed cache %s: %s", self._feed_cache_path, e)
+            return {}
+
+    def _save_feed_cache(self) -> None:
+        """Persist the HTTP validator cache for the next run."""
+        try:
+            self._feed_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            if orjson:
+                data = orjson.dumps(self._feed_cache)
+            else:
+                data = json.dumps(self._feed_cache, separators=(",", ":")).encode("utf-8")
+            temp_path = f"{self._feed_cache_path}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._feed_cache_path)
+        except OSError as e:
+            logger.warning("Could not save feed cache %s: %s", self._feed_cache_path, e)
 
     def _load_config(self) -> Dict[str, Any]:
         """Load the user's configuration."""
@@ -106,39 +306,145 @@ class FeedFetcher:
         except Exception:
             return "Unknown Feed"
 
+    def _clean_contents(self, contents: List[str]) -> List[str]:
+        """Clean article HTML, fanning out to worker processes for large feeds."""
+        if len(contents) < CLEAN_PARALLEL_THRESHOLD:
+            return [clean_html(content) for content in contents]
+
+        with self._clean_pool_lock:
+            if self._clean_pool is None:
+                # The pool is started from a fetch thread, and forking a
+                # threaded process can deadlock the child, so never fork
+                method = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                          else "spawn")
+                self._clean_pool = ProcessPoolExecutor(
+                    mp_context=multiprocessing.get_context(method)
+                )
+        try:
+            return list(self._clean_pool.map(clean_html, contents, chunksize=8))
+        except Exception as e:
+            logger.warning("Parallel HTML cleaning failed, cleaning serially: %s", e)
+            return [clean_html(content) for content in contents]
+
+    def _get_article_cache(self) -> Optional[shelve.Shelf]:
+        """Open the persistent article cache, or None if it is unavailable.
+
+        Must be called with ``_article_cache_lock`` held.
+        """
+        if self._article_cache is None:
+            try:
+                self._article_cache_path.parent.mkdir(parents=True, exist_ok=True)
+                self._article_cache = shelve.open(str(self._article_cache_path))
+            except Exception as e:
+                logger.warning("Article cache unavailable (%s): %s", self._article_cache_path, e)
+                return None
+        return self._article_cache
+
+    def _close_article_cache(self) -> None:
+        """Evict the least recently used articles and close the cache."""
+        with self._article_cache_lock:
+            cache, self._article_cache = self._article_cache, None
+            if cache is None:
+                return
+            try:
+                excess = len(cache) - ARTICLE_CACHE_MAX_ENTRIES
+                if excess > 0:
+                    by_age = sorted(cache.keys(), key=lambda key: cache[key][2])
+                    for key in by_age[:excess]:
+                        del cache[key]
+            finally:
+                cache.close()
+
+    def _clean_entries(self, url: str, entries: List[Dict[str, str]]) -> List[str]:
+        """Clean the HTML of feed entries, reusing results from earlier runs.
+
+        Entries are identified by feed URL plus GUID (or link). A cached
+        result is only used if the raw content is unchanged.
+        """
+        now = time.time()
+        keys = [
+            f"{url}\n{entry['id'] or entry['link']}" if entry["id"] or entry["link"] else None
+            for entry in entries
+        ]
+        # Empty and short plain-text entries need neither the cache nor the cleaner
+        cleaned = [_clean_trivial(entry["content"]) for entry in entries]
+        digests = [
+            hashlib.blake2b(entry["content"].encode("utf-8"), digest_size=16).digest()
+            if content is None else None
+            for entry, content in zip(entries, cleaned)
+        ]
+
+        with self._article_cache_lock:
+            cache = self._get_article_cache()
+            if cache is not None:
+                for i, key in enumerate(keys):
+                    if cleaned[i] is not None:
+                        continue
+                    hit = cache.get(key) if key else None
+                    if hit is not None and hit[0] == digests[i]:
+                        cleaned[i] = hit[1]
+                        cache[key] = (hit[0], hit[1], now)
+
+        misses = [i for i, content in enumerate(cleaned) if content is None]
+        if misses:
+            results = self._clean_contents([entries[i]["content"] for i in misses])
+            with self._article_cache_lock:
+                cache = self._get_article_cache()
+                for i, content in zip(misses, results):
+                    cleaned[i] = content
+                    if cache is not None and keys[i]:
+                        cache[keys[i]] = (digests[i], content, now)
+
+        return cleaned
+
+    def _download(self, url: str, cached: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """Download the raw feed document.
+
+        When ``cached`` holds validators from a previous fetch, the request is
+        made conditional and the server may answer 304 Not Modified.
+        """
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        response = self._session.get(url, timeout=FEED_TIMEOUT, headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
     def _fetch_feed(self, url: str, max_articles: int = 5) -> List[Dict[str, Any]]:
         """Fetch and parse a single RSS feed."""
         try:
             logger.info("Fetching feed: %s", url)
-            feed = feedparser.parse(url)
+            cached = self._feed_cache.get(url)
+            if cached and cached.get("max_articles", 0) < max_articles:
+                # The cached articles may be fewer than now wanted
+                cached = None
+            response = self._download(url, cached)
+            if response.status_code == 304 and cached:
+                logger.info("Feed not modified, using cached articles: %s", url)
+                return cached["articles"][:max_articles]
 
-            if feed.get("bozo"):
-                logger.warning("Feed parse error (%s): %s", url, feed.bozo_exception)
+            try:
+                entries = parse_feed_entries(response.content, max_articles)
+            except etree.XMLSyntaxError as e:
+                logger.warning("Feed parse error (%s): %s", url, e)
                 return []
 
+            # Clean the HTML content
+            contents = self._clean_entries(url, entries)
+
             articles = []
-            for entry in feed.entries[:max_articles]:
+            for entry, content in zip(entries, contents):
                 try:
-                    # Extract content - try different possible fields
-                    content = ""
-                    for field in ["content", "summary", "description"]:
-                        if field in entry:
-                            content = (
-                                entry[field][0]["value"]
-                                if isinstance(entry[field], list)
-                                else entry[field]
-                            )
-                            break
-
-                    # Clean the HTML content
-                    content = clean_html(content)
-
                     # Create article dict
                     article = {
-                        "title": entry.get("title", "Untitled"),
-                        "link": entry.get("link", ""),
-                        "published": entry.get("published", ""),
-                        "author": entry.get("author", ""),
+                        "title": entry["title"] or "Untitled",
+                        "link": entry["link"],
+                        "published": entry["published"],
+                        "author": entry["author"],
                         "content": content,
                     }
                     articles.append(article)
@@ -146,26 +452,48 @@ class FeedFetcher:
                 except Exception as e:
                     logger.warning("Error processing entry in %s: %s", url, e)
 
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._feed_cache[url] = {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "max_articles": max_articles,
+                    "articles": articles,
+                }
+            else:
+                self._feed_cache.pop(url, None)
+
             return articles
 
         except Exception as e:
             logger.error("Error fetching feed %s: %s", url, e)
             return []
 
-    def fetch_all(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Fetch all configured feeds.
-        
-        Returns:
-            Dictionary mapping feed names to lists of articles
-            
-        Raises:
-            ValueError: If there are issues with the configuration
+    def _fetch_feed_politely(self, url: str, max_articles: int) -> List[Dict[str, Any]]:
+        """Fetch a feed, waiting if its host was hit within HOST_FETCH_INTERVAL.
+
+        Each request reserves the next free start slot for its host, so
+        requests to one host start at least HOST_FETCH_INTERVAL apart while
+        no lock is held during the download itself.
         """
-        if not self.feeds:
-            logger.error("No feeds configured or error loading configuration")
-            return {}
+        host = urlparse(url).netloc
+        with self._host_slot_lock:
+            now = time.monotonic()
+            start = max(now, self._host_next_slot[host])
+            self._host_next_slot[host] = start + HOST_FETCH_INTERVAL
+        if start > now:
+            time.sleep(start - now)
+        return self._fetch_feed(url, max_articles)
 
-        results = {}
+    def _iter_fetched(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Fetch all enabled feeds concurrently.
+
+        Yields:
+            (feed name, articles) for each feed that returned articles, in
+            configured order, as soon as that feed and all before it are done
+        """
+        jobs = []
         for feed_name, feed_config in self.feeds.items():
             if not feed_config.get('enabled', True):
                 logger.info("Skipping disabled feed: %s", feed_name)
@@ -176,29 +504,80 @@ class FeedFetcher:
                 logger.warning("Skipping feed with no URL: %s", feed_name)
                 continue
                 
-            max_articles = feed_config.get('max_items', 10)
-            logger.info("Fetching feed: %s (max items: %d)", feed_name, max_articles)
-            
-            try:
-                articles = self._fetch_feed(url, max_articles)
-                if articles:
-                    results[feed_name] = articles
-                    logger.info("Fetched %d articles from %s", len(articles), feed_name)
-                else:
-                    logger.warning("No articles fetched from %s", feed_name)
-                    
-                # Be nice to servers
-                time.sleep(1)
+            jobs.append((feed_name, url, feed_config.get('max_items', 10)))
+        
+        if not jobs:
+            return
+        
+        try:
+            with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(jobs))) as executor:
+                futures = []
+                for feed_name, url, max_articles in jobs:
+                    logger.info("Fetching feed: %s (max items: %d)", feed_name, max_articles)
+                    futures.append(executor.submit(self._fetch_feed_politely, url, max_articles))
                     
-            except Exception as e:
-                logger.error("Error fetching feed %s: %s", feed_name, e, exc_info=True)
-                continue
+                for (feed_name, _, _), future in zip(jobs, futures):
+                    try:
+                        articles = future.result()
+                    except Exception as e:
+                        logger.error("Error fetching feed %s: %s", feed_name, e, exc_info=True)
+                        continue
+                        
+                    if articles:
+                        logger.info("Fetched %d articles from %s", len(articles), feed_name)
+                        yield feed_name, articles
+                    else:
+                        logger.warning("No articles fetched from %s", feed_name)
+        finally:
+            self._save_feed_cache()
+            self._close_article_cache()
+            if self._clean_pool is not None:
+                self._clean_pool.shutdown()
+                self._clean_pool = None
+
+    def fetch_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Fetch all configured feeds.
+        
+        Feeds are fetched concurrently; requests to the same host are still
+        made one at a time and spaced out to be nice to servers.
+        
+        Returns:
+            Dictionary mapping feed names to lists of articles
+            
+        Raises:
+            ValueError: If there are issues with the configuration
+        """
+        if not self.feeds:
+            logger.error("No feeds configured or error loading configuration")
+            return {}
+
+        results = dict(self._iter_fetched())
                 
         if not results:
             logger.warning("No articles were fetched from any feeds")
             
         return results
 
+    def fetch_stream(self, feed_queue: "queue.Queue[Optional[Tuple[str, List[Dict[str, Any]]]]]") -> None:
+        """Fetch all configured feeds, handing each one over as it is ready.
+        
+        Meant to run in a producer thread: puts (feed name, articles) tuples
+        on ``feed_queue`` in configured order, followed by a ``None``
+        sentinel once all feeds are done (or fetching failed).
+        
+        Args:
+            feed_queue: Queue receiving the fetched feeds
+        """
+        try:
+            if not self.feeds:
+                logger.error("No feeds configured or error loading configuration")
+                return
+            for item in self._iter_fetched():
+                feed_queue.put(item)
+        except Exception as e:
+            logger.error("Error fetching feeds: %s", e, exc_info=True)
+        finally:
+            feed_queue.put(None)
 
 def main() -> int:
     """Handle command-line interface for fetching feeds and building EPUB.
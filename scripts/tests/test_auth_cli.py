@@ -1,168 +1,136 @@
-""
+"""
 Tests for the authentication CLI.
 """
-import sys
-from unittest import TestCase, mock
-from http.server import HTTPServer
-from threading import Thread
-
-from scripts.auth import cli
-from scripts.auth.oauth_handler import OAuthHandler
-
-
-class TestAuthCLI(TestCase):
-    """Test the authentication command-line interface."""
-    
-    @mock.patch('webbrowser.open')
-    @mock.patch('scripts.auth.cli.OAuthHandler')
-    @mock.patch('scripts.auth.cli.HTTPServer')
-    def test_run_oauth_flow_success(self, mock_http_server, mock_oauth_handler, mock_webbrowser):
-        """Test successful OAuth flow."""
-        # Setup mocks
-        mock_handler = mock.Mock()
-        mock_handler.auth_code = 'test_code'
-        mock_http_server.return_value.RequestHandlerClass = mock_handler
-        
-        mock_oauth = mock.Mock()
-        mock_oauth.get_authorization_url.return_value = 'http://example.com/auth'
-        mock_oauth.finish_authorization.return_value = {'access_token': 'test_token'}
-        mock_oauth_handler.return_value = mock_oauth
-        
-        # Run the flow
-        result = cli.run_oauth_flow('testuser')
-        
-        # Verify the result
-        self.assertTrue(result)
-        mock_webbrowser.assert_called_once_with('http://example.com/auth')
-        mock_oauth.finish_authorization.assert_called_once()
-    
-    @mock.patch('sys.exit')
-    @mock.patch('argparse.ArgumentParser.parse_args')
-    @mock.patch('scripts.auth.cli.run_oauth_flow')
-    def test_main_login_success(self, mock_run_oauth, mock_parse_args, mock_exit):
-        """Test main function with login command."""
-        # Setup mock args
-        mock_args = mock.Mock()
-        mock_args.command = 'login'
-        mock_args.username = 'testuser'
-        mock_parse_args.return_value = mock_args
-        
-        # Mock successful OAuth flow
-        mock_run_oauth.return_value = True
-        
-        # Call main
-        cli.main()
-        
-        # Verify the result
-        mock_run_oauth.assert_called_once_with('testuser')
-        mock_exit.assert_called_once_with(0)
-    
-    @mock.patch('sys.exit')
-    @mock.patch('argparse.ArgumentParser.parse_args')
-    @mock.patch('scripts.auth.cli.check_auth')
-    def test_main_check_authenticated(self, mock_check_auth, mock_parse_args, mock_exit):
-        """Test main function with check command when authenticated."""
-        # Setup mock args
-        mock_args = mock.Mock()
-        mock_args.command = 'check'
-        mock_args.username = 'testuser'
-        mock_parse_args.return_value = mock_args
-        
-        # Mock authenticated check
-        mock_check_auth.return_value = True
-        
-        # Call main
-        cli.main()
-        
-        # Verify the result
-        mock_check_auth.assert_called_once_with('testuser')
-        mock_exit.assert_called_once_with(0)
-    
-    @mock.patch('sys.exit')
-    @mock.patch('argparse.ArgumentParser.parse_args')
-    @mock.patch('scripts.auth.cli.logout_user')
-    def test_main_logout_success(self, mock_logout_user, mock_parse_args, mock_exit):
-        """Test main function with logout command."""
-        # Setup mock args
-        mock_args = mock.Mock()
-        mock_args.command = 'logout'
-        mock_args.username = 'testuser'
-        mock_parse_args.return_value = mock_args
-        
-        # Mock successful logout
-        mock_logout_user.return_value = True
-        
-        # Call main
-        cli.main()
-        
-        # Verify the result
-        mock_logout_user.assert_called_once_with('testuser')
-        mock_exit.assert_called_once_with(0)
-
-
-class TestOAuthCallbackHandler(TestCase):
-    """Test the OAuth callback handler."""
-    
-    def test_handle_callback_with_code(self):
-        """Test handling a callback with an authorization code."""
-        # Create a mock request
-        class MockRequest:
-            def makefile(self, *args, **kwargs):
-                return [b"GET /?code=test_code HTTP/1.1"]
-            
-            def sendall(self, data):
-                self.response = data
-            
-            def close(self):
-                pass
-        
-        # Create a mock server
-        class MockServer:
-            def __init__(self):
-                self.shutdown_called = False
-            
-            def shutdown(self):
-                self.shutdown_called = True
-        
-        # Setup the test
-        server = MockServer()
-        request = MockRequest()
-        
-        # Create and handle the request
-        handler = cli.OAuthCallbackHandler(request, ('127.0.0.1', 12345), server)
-        handler.handle()
-        
-        # Verify the response
-        self.assertEqual(handler.auth_code, 'test_code')
-        self.assertTrue(server.shutdown_called)
-        self.assertIn(b'Authentication successful!', request.response)
-    
-    def test_handle_callback_with_error(self):
-        """Test handling a callback with an error."""
-        # Create a mock request
-        class MockRequest:
-            def makefile(self, *args, **kwargs):
-                return [b"GET /?error=access_denied HTTP/1.1"]
-            
-            def sendall(self, data):
-                self.response = data
-            
-            def close(self):
-                pass
-        
-        # Create a mock server
-        class MockServer:
-            def shutdown(self):
-                pass
-        
-        # Setup the test
-        server = MockServer()
-        request = MockRequest()
-        
-        # Create and handle the request
-        handler = cli.OAuthCallbackHandler(request, ('127.0.0.1', 12345), server)
-        handler.handle()
-        
-        # Verify the response
-        self.assertEqual(handler.error, 'access_denied')
-        self.assertIn(b'Error: access_denied', request.response)
+import argparse
+import io
+import webbrowser
+from unittest import mock
+
+import pytest
+
+from scripts.auth import cli, config, oauth_handler
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    """Reset per-process caches between tests."""
+    cli._cached_auth_url.cache_clear()
+
+
+@pytest.fixture
+def mock_args(monkeypatch, tmp_path):
+    """Substitute the parsed arguments for calls to cli.main().
+
+    main() also sets up an auth.log file handler in the working directory,
+    so the test runs from its own temporary directory.
+    """
+    args = mock.Mock()
+    args.username = 'testuser'
+    args.no_browser = False
+    monkeypatch.setattr(argparse.ArgumentParser, 'parse_args', mock.Mock(return_value=args))
+    monkeypatch.chdir(tmp_path)
+    return args
+
+
+def test_run_oauth_flow_success(monkeypatch):
+    """Test successful OAuth flow."""
+    # Setup mocks
+    mock_webbrowser = mock.Mock()
+    mock_http_server = mock.MagicMock()
+    mock_oauth_handler = mock.Mock()
+    monkeypatch.setattr(webbrowser, 'open', mock_webbrowser)
+    monkeypatch.setattr(config, 'get_oauth_config', mock.Mock(return_value={'redirect_port': 5000}))
+    monkeypatch.setattr(oauth_handler, 'OAuthHandler', mock_oauth_handler)
+    monkeypatch.setattr(cli, 'OAuthCallbackServer', mock_http_server)
+    httpd = mock_http_server.return_value.__enter__.return_value
+
+    def receive_callback():
+        httpd.auth_code = 'test_code'
+    httpd.handle_request.side_effect = receive_callback
+
+    mock_oauth = mock.Mock()
+    mock_oauth.get_authorization_url.return_value = 'http://example.com/auth'
+    mock_oauth.finish_authorization.return_value = {'access_token': 'test_token'}
+    mock_oauth_handler.return_value = mock_oauth
+
+    # Run the flow
+    result = cli.run_oauth_flow('testuser')
+
+    # Verify the result
+    assert result
+    mock_webbrowser.assert_called_once_with('http://example.com/auth')
+    httpd.handle_request.assert_called_once()
+    mock_oauth.finish_authorization.assert_called_once()
+
+
+@pytest.mark.parametrize("command,target_attr,result", [
+    ("login", "run_oauth_flow", True),
+    ("logout", "logout_user", True),
+    ("status", "get_authenticated_client", mock.Mock()),
+])
+def test_main_dispatch(monkeypatch, mock_args, command, target_attr, result):
+    """Test main dispatches each command to its handler and returns success."""
+    mock_args.command = command
+
+    # Mock a successful command
+    mock_fn = mock.Mock(return_value=result)
+    monkeypatch.setattr(cli, target_attr, mock_fn)
+
+    # Verify the handler ran and main reports success
+    assert cli.main() == 0
+    mock_fn.assert_called_once_with('testuser')
+
+
+@pytest.mark.parametrize("command,target_attr", [
+    ("login", "run_oauth_flow"),
+    ("logout", "logout_user"),
+    ("status", "get_authenticated_client"),
+])
+def test_main_dispatch_failure(monkeypatch, mock_args, command, target_attr):
+    """Test main returns a non-zero status when the command fails."""
+    mock_args.command = command
+    monkeypatch.setattr(cli, target_attr, mock.Mock(return_value=None))
+
+    assert cli.main() == 1
+
+
+class MockRequest:
+    """Socket stand-in that serves one request line and records the response."""
+
+    def __init__(self, request_line):
+        self.request_line = request_line
+        self.response = None
+
+    def makefile(self, *args, **kwargs):
+        return io.BytesIO(self.request_line)
+
+    def sendall(self, data):
+        self.response = data
+
+    def close(self):
+        pass
+
+
+class MockServer:
+    """Server stand-in receiving the callback result."""
+    auth_code = None
+    error = None
+
+
+@pytest.mark.parametrize("request_line,attr,value,message", [
+    (b"GET /?code=test_code HTTP/1.1\r\n\r\n", 'auth_code', 'test_code',
+     b'Authentication successful!'),
+    (b"GET /?error=access_denied HTTP/1.1\r\n\r\n", 'error', 'access_denied',
+     b'Error: access_denied'),
+])
+def test_handle_callback(request_line, attr, value, message):
+    """Test handling a callback with an authorization code or an error."""
+    server = MockServer()
+    request = MockRequest(request_line)
+
+    # The handler processes the request on construction
+    cli.OAuthCallbackHandler(request, ('127.0.0.1', 12345), server)
+
+    # Verify the response
+    assert getattr(server, attr) == value
+    assert message in request.response
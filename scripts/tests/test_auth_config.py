@@ -1,57 +1,77 @@
-""
+"""
 Tests for the authentication configuration module.
 """
 import os
-from unittest import TestCase, mock
 from pathlib import Path
 
+import pytest
+
 from scripts.auth import config
 
 
-class TestConfig(TestCase):
-    """Test configuration handling."""
-    
-    def setUp(self):
-        """Set up test environment."""
-        self.test_env = {
-            "DROPBOX_APP_KEY": "test_app_key",
-            "DROPBOX_APP_SECRET": "test_app_secret",
-            "OAUTH_REDIRECT_PORT": "1234",
-            "DEBUG": "true"
-        }
-        
-    @mock.patch.dict(os.environ, {"DROPBOX_APP_KEY": "test_key", "DROPBOX_APP_SECRET": "test_secret"})
-    def test_get_oauth_config(self):
-        """Test getting OAuth configuration."""
-        config_data = config.get_oauth_config()
-        self.assertEqual(config_data["app_key"], "test_key")
-        self.assertEqual(config_data["app_secret"], "test_secret")
-        self.assertEqual(config_data["redirect_port"], config.DEFAULT_OAUTH_REDIRECT_PORT)
-    
-    @mock.patch.dict(os.environ, {})
-    def test_get_oauth_config_missing_required(self):
-        """Test that missing required environment variables raise an error."""
-        with self.assertRaises(ValueError):
+@pytest.fixture
+def env(monkeypatch):
+    """Give each test a clean view of the configuration environment."""
+    config.get_oauth_config.cache_clear()
+    config.is_debug.cache_clear()
+    # Rely on the (patched) process environment only, never on a local .env
+    monkeypatch.setattr(config, "_dotenv_loaded", True)
+    for name in ("DROPBOX_APP_KEY", "DROPBOX_APP_SECRET", "OAUTH_REDIRECT_PORT", "DEBUG"):
+        monkeypatch.delenv(name, raising=False)
+    yield monkeypatch
+    config.get_oauth_config.cache_clear()
+    config.is_debug.cache_clear()
+
+
+@pytest.mark.parametrize("values,expected", [
+    (
+        {"DROPBOX_APP_KEY": "test_key", "DROPBOX_APP_SECRET": "test_secret"},
+        {"app_key": "test_key", "app_secret": "test_secret",
+         "redirect_port": config.DEFAULT_OAUTH_REDIRECT_PORT},
+    ),
+    ({}, None),
+])
+def test_get_oauth_config(env, values, expected):
+    """Test getting OAuth configuration, and that missing variables raise an error."""
+    for name, value in values.items():
+        env.setenv(name, value)
+    if expected is None:
+        with pytest.raises(ValueError):
             config.get_oauth_config()
-    
-    def test_get_token_path(self):
-        """Test getting token path for a user."""
-        username = "testuser"
-        token_path = config.get_token_path(username)
-        self.assertIn(username, str(token_path))
-        self.assertTrue(str(token_path).endswith(".json"))
-    
-    @mock.patch.dict(os.environ, {"DEBUG": "true"})
-    def test_is_debug_true(self):
-        """Test debug mode detection when enabled."""
-        self.assertTrue(config.is_debug())
-    
-    @mock.patch.dict(os.environ, {"DEBUG": "false"})
-    def test_is_debug_false(self):
-        """Test debug mode detection when disabled."""
-        self.assertFalse(config.is_debug())
-    
-    @mock.patch.dict(os.environ, {})
-    def test_is_debug_default(self):
-        """Test debug mode default value."""
-        self.assertFalse(config.is_debug())
+        return
+    config_data = config.get_oauth_config()
+    for key, value in expected.items():
+        assert config_data[key] == value
+
+
+@pytest.mark.parametrize("values,expected", [
+    ({"DEBUG": "true"}, True),
+    ({"DEBUG": "false"}, False),
+    ({}, False),
+])
+def test_is_debug(env, values, expected):
+    """Test debug mode detection, including its default."""
+    for name, value in values.items():
+        env.setenv(name, value)
+    assert config.is_debug() is expected
+
+
+@pytest.fixture
+def home(monkeypatch, tmp_path):
+    """Point the home directory at a temporary directory."""
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    config.get_token_path.cache_clear()
+    yield tmp_path
+    config.get_token_path.cache_clear()
+
+
+def test_get_token_path(home):
+    """Test getting token path for a user."""
+    username = "testuser"
+    if os.name == "nt":
+        tokens_dir = home / ".rss-to-kobo" / "tokens"
+    else:
+        tokens_dir = home / ".local" / "share" / "rss-to-kobo" / "tokens"
+    token_path = config.get_token_path(username)
+    assert token_path == tokens_dir / username
+    assert tokens_dir.is_dir()
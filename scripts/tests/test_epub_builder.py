@@ -0,0 +1,71 @@
+"""
+Tests for the EPUB builder.
+"""
+import posixpath
+import zipfile
+
+import pytest
+from lxml import etree
+
+from scripts import epub_builder
+from scripts.epub_builder import build_epub
+
+OPF_NS = {"opf": "http://www.idpf.org/2007/opf"}
+CONTAINER_NS = {"c": "urn:oasis:names:tc:opendocument:xmlns:container"}
+
+FEEDS = {
+    "Feed & One": [
+        {
+            "title": "Article <1>",
+            "link": "https://example.com/1",
+            "published": "2023-01-01T12:00:00Z",
+            "author": "Author 1",
+            "content": "<p>First article with an unclosed<br> tag",
+        },
+        {"title": "Article 2", "content": ""},
+    ],
+    "Feed Two": [
+        {"title": "Article 3", "content": "<div><p>Third article</p></div>"},
+    ],
+}
+
+
+@pytest.fixture
+def output_path(monkeypatch, tmp_path):
+    """Write the EPUB into the test's temporary directory."""
+    path = tmp_path / "test.epub"
+    monkeypatch.setattr(epub_builder, "get_output_path", lambda user: path)
+    return path
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_build_epub_archive(output_path, compress):
+    """Test that the EPUB archive is laid out as reading systems expect."""
+    assert build_epub("test_user", FEEDS, compress=compress) == output_path
+
+    with zipfile.ZipFile(output_path) as zf:
+        # The mimetype entry comes first and is stored uncompressed
+        first = zf.infolist()[0]
+        assert first.filename == "mimetype"
+        assert first.compress_type == zipfile.ZIP_STORED
+        assert zf.read("mimetype") == b"application/epub+zip"
+
+        # The container points at the package document
+        container = etree.fromstring(zf.read("META-INF/container.xml"))
+        opf_path = container.find("c:rootfiles/c:rootfile", CONTAINER_NS).get("full-path")
+        opf = etree.fromstring(zf.read(opf_path))
+        opf_dir = posixpath.dirname(opf_path)
+
+        # Every manifest item is in the archive and every document parses
+        names = set(zf.namelist())
+        items = opf.findall("opf:manifest/opf:item", OPF_NS)
+        hrefs = {item.get("id"): posixpath.join(opf_dir, item.get("href")) for item in items}
+        assert set(hrefs.values()) <= names
+        for item in items:
+            if item.get("media-type") != "text/css":
+                etree.fromstring(zf.read(hrefs[item.get("id")]))
+
+        # The NCX and nav document are among them, and the spine lists the chapters
+        assert {"ncx", "nav"} <= hrefs.keys()
+        spine = [ref.get("idref") for ref in opf.findall("opf:spine/opf:itemref", OPF_NS)]
+        assert spine == ["nav", "feed_0", "feed_1"]
@@ -0,0 +1,254 @@
+"""
+Tests for feed fetching and the caches kept between runs.
+"""
+import importlib
+import shelve
+from unittest import mock
+
+import pytest
+
+from scripts.fetch_and_build import FeedFetcher
+
+# The scripts package exports the module's main() as ``fetch_and_build``
+fetch_and_build = importlib.import_module("scripts.fetch_and_build")
+
+USER = "test_user"
+FEED_URL = "https://example.com/feed"
+
+# Long enough to go through the HTML cleaner rather than the plain-text shortcut
+CONTENT = "<p>An article long enough to need the HTML cleaner.</p>"
+
+
+@pytest.fixture
+def cache_dir(monkeypatch, tmp_path):
+    """Keep the article and feed caches in the test's temporary directory."""
+    monkeypatch.setattr(fetch_and_build, "CACHE_DIR", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def fetcher(monkeypatch, cache_dir):
+    """Fetcher for a single feed, with the configuration mocked."""
+    config = {"feeds": [{"name": "Test Feed", "url": FEED_URL, "max_items": 5}]}
+    monkeypatch.setattr(fetch_and_build, "load_feeds_config", mock.Mock(return_value=config))
+    return FeedFetcher(USER)
+
+
+@pytest.fixture
+def cleaner(monkeypatch):
+    """Record which contents reach the HTML cleaner."""
+    clean = mock.Mock(side_effect=lambda content: f"clean:{content}")
+    monkeypatch.setattr(fetch_and_build, "clean_html", clean)
+    return clean
+
+
+def entry(number, content=CONTENT):
+    """Build a parsed feed entry."""
+    return {
+        "title": f"Article {number}",
+        "link": f"https://example.com/{number}",
+        "published": "",
+        "author": "",
+        "id": f"urn:article:{number}",
+        "content": content,
+    }
+
+
+def test_article_cache_hit(fetcher, cache_dir, cleaner):
+    """Test that unchanged articles are served from the cache of an earlier run."""
+    entries = [entry(1), entry(2)]
+    assert fetcher._clean_entries(FEED_URL, entries) == [f"clean:{CONTENT}"] * 2
+    fetcher._close_article_cache()
+    assert cleaner.call_count == 2
+
+    # A new run reuses the cleaned HTML without calling the cleaner
+    cleaner.reset_mock()
+    assert FeedFetcher(USER)._clean_entries(FEED_URL, entries) == [f"clean:{CONTENT}"] * 2
+    cleaner.assert_not_called()
+
+
+def test_article_cache_digest_mismatch(fetcher, cleaner):
+    """Test that an article whose content changed is cleaned again."""
+    fetcher._clean_entries(FEED_URL, [entry(1)])
+    cleaner.reset_mock()
+
+    changed = CONTENT.replace("article", "updated article")
+    assert fetcher._clean_entries(FEED_URL, [entry(1, changed)]) == [f"clean:{changed}"]
+    cleaner.assert_called_once_with(changed)
+
+
+def test_article_cache_evicts_least_recently_used(fetcher, cache_dir):
+    """Test that closing the cache trims it to the entry cap, oldest first."""
+    cap = fetch_and_build.ARTICLE_CACHE_MAX_ENTRIES
+    path = str(cache_dir / f"articles_{USER}")
+    with shelve.open(path) as cache:
+        for i in range(cap + 2):
+            cache[f"key{i}"] = (b"digest", "content", float(i))
+        # Touch the oldest entry, as a cache hit would
+        cache["key0"] = (b"digest", "content", float(cap + 2))
+
+    with fetcher._article_cache_lock:
+        fetcher._get_article_cache()
+    fetcher._close_article_cache()
+
+    with shelve.open(path) as cache:
+        assert len(cache) == cap
+        assert "key0" in cache
+        assert "key1" not in cache and "key2" not in cache
+        assert "key3" in cache
+
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0">
+  <channel>
+    <title>Test Feed</title>
+    <item>
+      <title>Article 1</title>
+      <link>https://example.com/1</link>
+      <description>Plain text</description>
+    </item>
+  </channel>
+</rss>"""
+
+
+def response(status_code=200, content=b"", headers=None):
+    """Build a mocked HTTP response."""
+    return mock.Mock(status_code=status_code, content=content, headers=headers or {})
+
+
+@pytest.mark.parametrize("cached,expected", [
+    (None, {}),
+    ({"etag": '"v1"', "last_modified": None}, {"If-None-Match": '"v1"'}),
+    ({"etag": None, "last_modified": "Mon, 02 Jan 2023 00:00:00 GMT"},
+     {"If-Modified-Since": "Mon, 02 Jan 2023 00:00:00 GMT"}),
+])
+def test_download_sends_validators(fetcher, cached, expected):
+    """Test that cached ETag and Last-Modified values make the request conditional."""
+    fetcher._session = mock.Mock()
+    fetcher._session.get.return_value = response(304)
+
+    assert fetcher._download(FEED_URL, cached).status_code == 304
+    fetcher._session.get.assert_called_once_with(
+        FEED_URL, timeout=fetch_and_build.FEED_TIMEOUT, headers=expected
+    )
+
+
+def test_not_modified_reuses_cached_articles(fetcher, cache_dir):
+    """Test that a 304 in a later run returns the articles stored by the first."""
+    validators = {"ETag": '"v1"', "Last-Modified": "Mon, 02 Jan 2023 00:00:00 GMT"}
+    fetcher._session = mock.Mock()
+    fetcher._session.get.return_value = response(200, RSS, validators)
+    articles = fetcher._fetch_feed(FEED_URL, max_articles=5)
+    assert [article["title"] for article in articles] == ["Article 1"]
+    fetcher._save_feed_cache()
+    assert (cache_dir / f"feed_cache_{USER}.json").exists()
+
+    # The next run sends the stored validators and is told nothing changed
+    rerun = FeedFetcher(USER)
+    rerun._session = mock.Mock()
+    rerun._session.get.return_value = response(304)
+    with mock.patch.object(fetch_and_build, "parse_feed_entries") as parse:
+        assert rerun._fetch_feed(FEED_URL, max_articles=5) == articles
+    parse.assert_not_called()
+    headers = rerun._session.get.call_args.kwargs["headers"]
+    assert headers == {"If-None-Match": '"v1"',
+                       "If-Modified-Since": "Mon, 02 Jan 2023 00:00:00 GMT"}
+
+
+def test_cache_ignored_when_more_articles_wanted(fetcher):
+    """Test that cached articles are not reused when more are now requested."""
+    fetcher._feed_cache[FEED_URL] = {
+        "etag": '"v1"', "last_modified": None, "max_articles": 1, "articles": [],
+    }
+    fetcher._session = mock.Mock()
+    fetcher._session.get.return_value = response(200, RSS)
+
+    assert len(fetcher._fetch_feed(FEED_URL, max_articles=5)) == 1
+    assert fetcher._session.get.call_args.kwargs["headers"] == {}
+    # The response carried no validators, so the stale entry is dropped
+    assert FEED_URL not in fetcher._feed_cache
+
+
+RSS1 = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns="http://purl.org/rss/1.0/"
+         xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <channel rdf:about="https://example.com/">
+    <title>Test Feed</title>
+  </channel>
+  <item rdf:about="https://example.com/1">
+    <title>Article 1</title>
+    <link>https://example.com/1</link>
+    <description>Summary 1</description>
+    <dc:creator>Author 1</dc:creator>
+    <dc:date>2023-01-01T12:00:00Z</dc:date>
+  </item>
+</rdf:RDF>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Test Feed</title>
+  <entry>
+    <title type="html">A &amp;amp; B</title>
+    <link rel="self" href="https://example.com/1.atom"/>
+    <link href="https://example.com/1"/>
+    <id>urn:article:1</id>
+    <updated>2023-01-01T12:00:00Z</updated>
+    <author><name>Author 1</name></author>
+    <summary>Summary 1</summary>
+    <content type="html">&lt;p&gt;Content 1&lt;/p&gt;</content>
+  </entry>
+</feed>"""
+
+
+def numbered_rss(count):
+    """Build an RSS 2.0 document with the given number of items."""
+    items = "".join(
+        f"<item><title>Article {i}</title><link>https://example.com/{i}</link></item>"
+        for i in range(count)
+    )
+    return f'<rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+@pytest.mark.parametrize("document,expected", [
+    (RSS, {"title": "Article 1", "link": "https://example.com/1", "published": "",
+           "author": "", "id": "", "content": "Plain text"}),
+    (RSS1, {"title": "Article 1", "link": "https://example.com/1",
+            "published": "2023-01-01T12:00:00Z", "author": "Author 1", "id": "",
+            "content": "Summary 1"}),
+    (ATOM, {"title": "A & B", "link": "https://example.com/1",
+            "published": "2023-01-01T12:00:00Z", "author": "Author 1",
+            "id": "urn:article:1", "content": "<p>Content 1</p>"}),
+], ids=["rss2", "rss1", "atom"])
+def test_parse_feed_entries(document, expected):
+    """Test parsing RSS 2.0, RSS 1.0 and Atom entries."""
+    assert fetch_and_build.parse_feed_entries(document, 5) == [expected]
+
+
+def test_parse_feed_entries_unescapes_html_titles():
+    """Test that an Atom title of type html is decoded to plain text."""
+    document = ATOM.replace(b"A &amp;amp; B", b"Fish &amp;amp; Chips &amp;lt;3")
+    [entry] = fetch_and_build.parse_feed_entries(document, 5)
+    assert entry["title"] == "Fish & Chips <3"
+
+
+@pytest.mark.parametrize("max_articles,expected", [(0, 0), (2, 2), (10, 5)])
+def test_parse_feed_entries_max_articles(max_articles, expected):
+    """Test that parsing stops after max_articles entries."""
+    entries = fetch_and_build.parse_feed_entries(numbered_rss(5), max_articles)
+    assert [entry["title"] for entry in entries] == [f"Article {i}" for i in range(expected)]
+
+
+def test_parse_feed_entries_stops_before_malformed_tail():
+    """Test that entries after the last one needed are never parsed."""
+    document = numbered_rss(3).replace(b"</channel></rss>", b"<item><broken></channel>")
+    assert len(fetch_and_build.parse_feed_entries(document, 3)) == 3
+    with pytest.raises(fetch_and_build.etree.XMLSyntaxError):
+        fetch_and_build.parse_feed_entries(document, 4)
+
+
+def test_fetch_feed_parse_error(fetcher):
+    """Test that a malformed feed yields no articles instead of failing."""
+    fetcher._session = mock.Mock()
+    fetcher._session.get.return_value = response(200, b"<rss><channel><item>")
+    assert fetcher._fetch_feed(FEED_URL, max_articles=5) == []
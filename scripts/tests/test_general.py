@@ -0,0 +1,133 @@
+"""
+Tests for the general utilities.
+"""
+import os
+from datetime import datetime
+
+import pytest
+
+from scripts.utils import general
+
+
+@pytest.mark.parametrize("content,expected", [
+    ("", ""),
+    ("<p>Text</p><script>alert(1)</script>", "<div><p>Text</p></div>"),
+    ('<p onclick="x()" title="t">Text</p>', '<p title="t">Text</p>'),
+    # lxml refuses str input with an encoding declaration; it must still be cleaned
+    ('<?xml version="1.0" encoding="iso-8859-1"?><p>Café<script>x</script></p>',
+     "<p>Café</p>"),
+])
+def test_clean_html(content, expected):
+    """Test that scripts and unsafe attributes are removed."""
+    assert general.clean_html(content) == expected
+
+
+class FixedDatetime(datetime):
+    """datetime whose now() is fixed, for the current-date fallback."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 5, 6, 7, 8)
+
+
+NOW = "May 06, 2024 at 07:08 AM"
+
+
+@pytest.fixture
+def dates(monkeypatch):
+    """Fix the current date and start from an empty date cache."""
+    monkeypatch.setattr(general, "datetime", FixedDatetime)
+    general._format_date_cached.cache_clear()
+    yield
+    general._format_date_cached.cache_clear()
+
+
+@pytest.mark.parametrize("date_str,expected", [
+    ("2023-01-02T15:04:00", "January 02, 2023 at 03:04 PM"),
+    ("2023-01-02T15:04:00+02:00", "January 02, 2023 at 03:04 PM"),
+    ("2023-01-02T15:04:00Z", "January 02, 2023 at 03:04 PM"),
+    ("2023-01-02", "January 02, 2023 at 12:00 AM"),
+    ("Mon, 02 Jan 2023 15:04:00 GMT", NOW),
+    ("", NOW),
+    (None, NOW),
+])
+def test_format_date(dates, date_str, expected):
+    """Test formatting naive and aware dates, with the current date as fallback."""
+    assert general.format_date(date_str) == expected
+    assert general.format_dates([date_str]) == [expected]
+
+
+def test_format_dates_parses_each_string_once(dates):
+    """Test that repeated dates in a batch are parsed once and cached across calls."""
+    date_strs = ["2023-01-02T15:04:00Z", None, "2023-01-02T15:04:00Z", "bad", "bad"]
+    expected = ["January 02, 2023 at 03:04 PM", NOW, "January 02, 2023 at 03:04 PM", NOW, NOW]
+    assert general.format_dates(date_strs) == expected
+    assert general._format_date_cached.cache_info().misses == 2
+
+    assert general.format_dates(iter(date_strs)) == expected
+    assert general._format_date_cached.cache_info().misses == 2
+
+
+CONFIG = """
+feeds:
+  - name: "Feed One"
+    url: "https://example.com/feed"
+"""
+
+
+@pytest.fixture
+def config_file(monkeypatch, tmp_path):
+    """Feed config for a test user in a temporary config directory."""
+    monkeypatch.setattr(general, "_CONFIG_ROOT", tmp_path)
+    monkeypatch.setattr(general, "_CONFIG_ROOT_EXISTS", True)
+    general.load_feeds_config.cache_clear()
+    path = tmp_path / "test_user.yaml"
+    path.write_text(CONFIG, encoding="utf-8")
+    yield path
+    general.load_feeds_config.cache_clear()
+
+
+def rewrite(path, content, mtime_ns):
+    """Replace a file's content and set its modification time."""
+    path.write_text(content, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def feed_names(config):
+    """Get the names of a config's feeds."""
+    return [feed["name"] for feed in config["feeds"]]
+
+
+def test_load_feeds_config_reloads_edited_file(config_file):
+    """Test that the cache is keyed on the file's modification time."""
+    mtime = config_file.stat().st_mtime_ns
+    assert feed_names(general.load_feeds_config("test_user")) == ["Feed One"]
+
+    # Same modification time: the cached config is returned
+    rewrite(config_file, CONFIG.replace("Feed One", "Feed Two"), mtime)
+    assert feed_names(general.load_feeds_config("test_user")) == ["Feed One"]
+
+    # Edited file: the config is parsed again
+    rewrite(config_file, CONFIG.replace("Feed One", "Feed Two"), mtime + 1_000_000)
+    assert feed_names(general.load_feeds_config("test_user")) == ["Feed Two"]
+
+
+def test_load_feeds_config_cache_clear(config_file):
+    """Test that cache_clear forces the file to be parsed again."""
+    mtime = config_file.stat().st_mtime_ns
+    general.load_feeds_config("test_user")
+    rewrite(config_file, CONFIG.replace("Feed One", "Feed Two"), mtime)
+
+    general.load_feeds_config.cache_clear()
+    assert feed_names(general.load_feeds_config("test_user")) == ["Feed Two"]
+
+
+def test_load_feeds_config_returns_copies(config_file):
+    """Test that callers can modify their config without affecting others."""
+    first = general.load_feeds_config("test_user")
+    first["feeds"][0]["max_items"] = 3
+    first["output"]["title"] = "Changed"
+
+    second = general.load_feeds_config("test_user")
+    assert "max_items" not in second["feeds"][0]
+    assert second["output"]["title"] == "Daily RSS Digest"
@@ -1,151 +1,282 @@
-""
+"""
 Tests for the OAuth handler module.
 """
-import json
+import copy
+import os
+import threading
 import time
-from datetime import datetime, timedelta
-from unittest import TestCase, mock
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
 
+import dropbox
 import pytest
 from dropbox.oauth import OAuth2FlowNoRedirectResult
 
 from scripts.auth.oauth_handler import OAuthHandler
-from scripts.auth import exceptions
+from scripts.auth import config
 from scripts.auth.secure_storage import SecureTokenStorage
 
 
-class TestOAuthHandler(TestCase):
-    """Test OAuth handler functionality."""
-    
-    def setUp(self):
-        """Set up test environment."""
-        self.username = "testuser"
-        self.handler = OAuthHandler(self.username)
-        self.test_tokens = {
-            'access_token': 'test_access_token',
-            'refresh_token': 'test_refresh_token',
-            'token_type': 'bearer',
-            'expires_at': int((datetime.utcnow() + timedelta(hours=1)).timestamp()),
-            'account_id': 'test_account_id',
-            'user_id': 'test_user_id',
-        }
-        
-        # Mock the secure storage
-        self.mock_storage = mock.Mock(spec=SecureTokenStorage)
-        self.handler.storage = self.mock_storage
-    
-    @mock.patch('scripts.auth.oauth_handler.DropboxOAuth2FlowNoRedirect')
-    def test_get_authorization_url(self, mock_flow):
-        """Test getting authorization URL."""
-        # Mock the flow
-        mock_flow.return_value.start.return_value = "http://example.com/auth"
-        
-        url = self.handler.get_authorization_url()
-        self.assertEqual(url, "http://example.com/auth")
-        mock_flow.return_value.start.assert_called_once()
-    
-    @mock.patch('scripts.auth.oauth_handler.DropboxOAuth2FlowNoRedirect')
-    def test_finish_authorization_success(self, mock_flow):
-        """Test successful authorization flow completion."""
-        # Mock the flow result
-        mock_result = mock.Mock(spec=OAuth2FlowNoRedirectResult)
-        mock_result.access_token = 'test_token'
-        mock_result.refresh_token = 'test_refresh_token'
-        mock_result.token_type = 'bearer'
-        mock_result.account_id = 'test_account_id'
-        mock_result.user_id = 'test_user_id'
-        mock_result.expires_in = 14400  # 4 hours
-        
-        mock_flow.return_value.finish.return_value = mock_result
-        
-        # Mock storage
-        self.mock_storage.save_tokens.return_value = True
-        
-        # Call the method
-        result = self.handler.finish_authorization("http://example.com/callback?code=test_code")
-        
-        # Verify the result
-        self.assertEqual(result['access_token'], 'test_token')
-        self.assertEqual(result['refresh_token'], 'test_refresh_token')
-        self.assertIn('expires_at', result)
-        self.mock_storage.save_tokens.assert_called_once()
-    
-    def test_is_token_expired(self):
-        """Test token expiration check."""
-        # Token expires in 1 hour
-        future_time = int((datetime.utcnow() + timedelta(hours=1)).timestamp())
-        self.assertFalse(self.handler._is_token_expired({'expires_at': future_time}))
-        
-        # Token expired 1 hour ago
-        past_time = int((datetime.utcnow() - timedelta(hours=1)).timestamp())
-        self.assertTrue(self.handler._is_token_expired({'expires_at': past_time}))
-        
-        # No expiration time (long-lived token)
-        self.assertFalse(self.handler._is_token_expired({}))
-    
-    @mock.patch('scripts.auth.oauth_handler.Dropbox')
-    def test_refresh_tokens_success(self, mock_dropbox):
-        """Test successful token refresh."""
-        # Mock the Dropbox client
-        mock_client = mock.Mock()
-        mock_client._oauth2_access_token = 'new_access_token'
-        mock_dropbox.return_value = mock_client
-        
-        # Mock storage
-        self.mock_storage.save_tokens.return_value = True
-        
-        # Call the method
-        result = self.handler.refresh_tokens('test_refresh_token')
-        
-        # Verify the result
-        self.assertEqual(result['access_token'], 'new_access_token')
-        self.assertEqual(result['refresh_token'], 'test_refresh_token')
-        self.mock_storage.save_tokens.assert_called_once()
-    
-    @mock.patch('scripts.auth.oauth_handler.Dropbox')
-    def test_get_authenticated_client(self, mock_dropbox):
-        """Test getting an authenticated client."""
-        # Mock get_valid_tokens
-        self.handler.get_valid_tokens = mock.Mock(return_value={'access_token': 'test_token'})
-        
-        # Call the method
-        client = self.handler.get_authenticated_client()
-        
-        # Verify the client was created with the correct token
-        self.assertIsNotNone(client)
-        mock_dropbox.assert_called_once_with(
-            oauth2_access_token='test_token',
-            user_agent=mock.ANY
-        )
-    
-    @mock.patch('scripts.auth.oauth_handler.Dropbox')
-    def test_is_authenticated_success(self, mock_dropbox):
-        """Test successful authentication check."""
-        # Mock get_valid_tokens to return valid tokens
-        self.handler.get_valid_tokens = mock.Mock(return_value={'access_token': 'test_token'})
-        
-        # Mock the Dropbox client
-        mock_client = mock.Mock()
-        mock_dropbox.return_value = mock_client
-        
-        # Call the method
-        result = self.handler.is_authenticated()
-        
-        # Verify the result
-        self.assertTrue(result)
-        mock_client.users_get_current_account.assert_called_once()
-    
-    def test_logout(self):
-        """Test logging out."""
-        # Mock storage
-        self.mock_storage.clear_tokens.return_value = True
-        
-        # Call the method
-        result = self.handler.logout()
-        
-        # Verify the result
-        self.assertTrue(result)
-        self.mock_storage.clear_tokens.assert_called_once()
+USERNAME = "testuser"
+
+# Concurrent callers in the single-flight refresh test
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch, tmp_path):
+    """Give each test its own credentials, home directory and token caches."""
+    monkeypatch.setattr(config, "_dotenv_loaded", True)
+    monkeypatch.setenv("DROPBOX_APP_KEY", "test_app_key")
+    monkeypatch.setenv("DROPBOX_APP_SECRET", "test_app_secret")
+    monkeypatch.setattr(Path, "home", lambda: tmp_path)
+    config.get_oauth_config.cache_clear()
+    config.get_token_path.cache_clear()
+    OAuthHandler._cached_tokens.clear()
+    OAuthHandler._refresh_locks.clear()
+    yield
+    config.get_oauth_config.cache_clear()
+    config.get_token_path.cache_clear()
+    OAuthHandler._cached_tokens.clear()
+    OAuthHandler._refresh_locks.clear()
+
+
+@pytest.fixture(scope="module")
+def templates(tmp_path_factory):
+    """Build the handler and spec'd storage mock once for the module."""
+    with pytest.MonkeyPatch.context() as mp:
+        home = tmp_path_factory.mktemp("home")
+        mp.setattr(Path, "home", lambda: home)
+        config.get_token_path.cache_clear()
+        handler = OAuthHandler(USERNAME)
+    config.get_token_path.cache_clear()
+    return handler, mock.Mock(spec=SecureTokenStorage)
+
+
+@pytest.fixture
+def mock_storage(templates, tmp_path):
+    """Storage mock copied from the template.
+    
+    Copies share child mocks with the template, so clear anything a previous
+    test recorded or configured. The token path points at a file that does
+    not exist yet.
+    """
+    storage = copy.copy(templates[1])
+    storage.reset_mock(return_value=True, side_effect=True)
+    storage.token_path = tmp_path / USERNAME
+    return storage
+
+
+@pytest.fixture
+def handler(templates, mock_storage):
+    """Handler copied from the template, with mocked storage."""
+    handler = copy.copy(templates[0])
+    handler.storage = mock_storage
+    return handler
+
+
+# The handler imports the Dropbox SDK classes from the dropbox module at call
+# time, so swapping the module attributes is enough to intercept them
+
+@pytest.fixture
+def mock_flow(monkeypatch):
+    """Replace the Dropbox OAuth flow class."""
+    flow = mock.Mock()
+    monkeypatch.setattr(dropbox, 'DropboxOAuth2FlowNoRedirect', flow)
+    return flow
+
+
+@pytest.fixture(autouse=True)
+def mock_dropbox(monkeypatch):
+    """Replace the Dropbox client class so no test reaches the API."""
+    client_cls = mock.Mock()
+    monkeypatch.setattr(dropbox, 'Dropbox', client_cls)
+    return client_cls
+
+
+def test_get_authorization_url(handler, mock_flow):
+    """Test getting authorization URL."""
+    # Mock the flow
+    mock_flow.return_value.start.return_value = "http://example.com/auth"
+    
+    url = handler.get_authorization_url()
+    assert url == "http://example.com/auth"
+    mock_flow.return_value.start.assert_called_once()
+
+
+def test_finish_authorization_success(handler, mock_storage, mock_flow):
+    """Test successful authorization flow completion."""
+    # Mock the flow result
+    mock_result = mock.Mock(spec=OAuth2FlowNoRedirectResult)
+    mock_result.access_token = 'test_token'
+    mock_result.refresh_token = 'test_refresh_token'
+    mock_result.token_type = 'bearer'
+    mock_result.account_id = 'test_account_id'
+    mock_result.user_id = 'test_user_id'
+    mock_result.expires_in = 14400  # 4 hours
+    
+    mock_flow.return_value.finish.return_value = mock_result
+    
+    # Mock storage
+    mock_storage.save_tokens.return_value = True
+    
+    # Call the method
+    result = handler.finish_authorization("http://example.com/callback?code=test_code")
+    
+    # Verify the result
+    expected = {
+        'access_token': 'test_token',
+        'refresh_token': 'test_refresh_token',
+        'token_type': 'bearer',
+        'account_id': 'test_account_id',
+    }
+    assert {k: result.get(k) for k in expected} == expected
+    assert 'expires_at' in result
+    mock_storage.save_tokens.assert_called_once()
+
+
+def test_is_token_expired(handler):
+    """Test token expiration check."""
+    # Token expires in 1 hour
+    future_time = int(time.time()) + 3600
+    assert not handler._is_token_expired({'expires_at': future_time})
+    
+    # Token expired 1 hour ago
+    past_time = int(time.time()) - 3600
+    assert handler._is_token_expired({'expires_at': past_time})
+    
+    # No expiration time (long-lived token)
+    assert not handler._is_token_expired({})
+
+
+def test_refresh_tokens_success(handler, mock_storage, mock_dropbox):
+    """Test successful token refresh."""
+    # Mock the Dropbox client
+    mock_client = mock.Mock()
+    mock_client._oauth2_access_token = 'new_access_token'
+    mock_dropbox.return_value = mock_client
+    
+    # Mock storage
+    mock_storage.save_tokens.return_value = True
+    
+    # Call the method
+    result = handler.refresh_tokens('test_refresh_token')
+    
+    # Verify the result
+    assert result['access_token'] == 'new_access_token'
+    assert result['refresh_token'] == 'test_refresh_token'
+    mock_storage.save_tokens.assert_called_once()
+
+
+def test_get_authenticated_client(handler, mock_dropbox):
+    """Test getting an authenticated client."""
+    # Mock get_valid_tokens
+    handler.get_valid_tokens = mock.Mock(return_value={'access_token': 'test_token'})
+    
+    # Call the method
+    client = handler.get_authenticated_client()
+    
+    # Verify the client was created with the correct token
+    assert client is not None
+    mock_dropbox.assert_called_once_with(
+        oauth2_access_token='test_token',
+        user_agent=mock.ANY,
+        session=mock.ANY
+    )
+    
+    # The client is reused while the access token is unchanged
+    assert handler.get_authenticated_client() is client
+    mock_dropbox.assert_called_once()
+
+
+def test_is_authenticated_success(handler, mock_dropbox):
+    """Test successful authentication check."""
+    # Mock get_valid_tokens to return valid tokens
+    handler.get_valid_tokens = mock.Mock(return_value={'access_token': 'test_token'})
+    
+    # Mock the Dropbox client
+    mock_client = mock.Mock()
+    mock_dropbox.return_value = mock_client
+    
+    # Call the method
+    result = handler.is_authenticated()
+    
+    # Verify the result
+    assert result
+    mock_client.users_get_current_account.assert_called_once()
+    # Tokens are loaded once and handed to get_authenticated_client
+    handler.get_valid_tokens.assert_called_once()
+
+
+def test_logout(handler, mock_storage):
+    """Test logging out."""
+    # Mock storage
+    mock_storage.clear_tokens.return_value = True
+    
+    # Call the method
+    result = handler.logout()
+    
+    # Verify the result
+    assert result
+    mock_storage.clear_tokens.assert_called_once()
+
+
+def test_get_valid_tokens_single_refresh(handler, mock_storage):
+    """Test that concurrent callers with expired tokens share one refresh."""
+    mock_storage.token_path.write_bytes(b"tokens")
+    mock_storage.load_tokens.return_value = {
+        'access_token': 'old_token',
+        'refresh_token': 'test_refresh_token',
+        'expires_at': int(time.time()) - 60,
+    }
+    fresh = {'access_token': 'new_token', 'refresh_token': 'test_refresh_token'}
+    barrier = threading.Barrier(THREADS)
+
+    def refresh(refresh_token):
+        # Give the other callers time to queue up behind the refresh lock
+        time.sleep(0.05)
+        return fresh
+
+    handlers = [copy.copy(handler) for _ in range(THREADS)]
+    for h in handlers:
+        h.refresh_tokens = mock.Mock(side_effect=refresh)
+
+    def get_tokens(h):
+        barrier.wait()
+        return h.get_valid_tokens()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = list(executor.map(get_tokens, handlers))
+
+    assert all(result is fresh for result in results)
+    assert sum(h.refresh_tokens.call_count for h in handlers) == 1
+
+
+def test_get_valid_tokens_reloads_changed_file(handler, mock_storage):
+    """Test that cached tokens are dropped when the token file changes or disappears."""
+    token_path = mock_storage.token_path
+    token_path.write_bytes(b"tokens")
+    first = {'access_token': 'first_token'}
+    second = {'access_token': 'second_token'}
+    mock_storage.load_tokens.return_value = first
+    assert handler.get_valid_tokens() is first
+
+    # Served from the cache while the file is unchanged
+    mock_storage.load_tokens.return_value = second
+    assert handler.get_valid_tokens() is first
+    mock_storage.load_tokens.assert_called_once()
+
+    # Another process rewrites the file
+    mtime = token_path.stat().st_mtime_ns
+    os.utime(token_path, ns=(mtime + 1_000_000, mtime + 1_000_000))
+    assert handler.get_valid_tokens() is second
+
+    # Another process logs out
+    token_path.unlink()
+    mock_storage.load_tokens.return_value = None
+    assert handler.get_valid_tokens() is None
+    assert USERNAME not in OAuthHandler._cached_tokens
 
 
 if __name__ == "__main__":
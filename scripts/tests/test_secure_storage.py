@@ -1,85 +1,127 @@
-""
+"""
 Tests for the secure token storage module.
 """
-import json
+import base64
+import hashlib
 import os
-import tempfile
-import unittest
-from pathlib import Path
-from unittest import mock
 
-from scripts.auth.secure_storage import SecureTokenStorage
+import pytest
+
+from scripts.auth import secure_storage
+from scripts.auth.secure_storage import SecureTokenStorage, generate_key_from_password
 from scripts.auth.exceptions import TokenStorageError
 
+KDF_PASSWORD = "testpassword"
+
+
+@pytest.fixture(scope="session")
+def derived_key():
+    """Derive the (deliberately slow) test key once per session."""
+    return generate_key_from_password(KDF_PASSWORD)
+
+
+@pytest.fixture
+def fast_kdf(monkeypatch):
+    """Run the key derivation with a single iteration.
+    
+    Derived keys and Fernets are cached per process, so both caches are
+    emptied around the test to keep fast keys from leaking into other tests.
+    """
+    secure_storage._derive_key.cache_clear()
+    monkeypatch.setattr(secure_storage, "ITERATIONS", 1)
+    monkeypatch.setattr(secure_storage, "_FERNETS", {})
+    yield
+    secure_storage._derive_key.cache_clear()
+
+
+USERNAME = "testuser"
+PASSWORD = "testpassword123"
+
+
+@pytest.fixture
+def tokens():
+    """Tokens to store; save_tokens stamps them, so each test gets its own."""
+    return {
+        "access_token": "test_access_token",
+        "refresh_token": "test_refresh_token",
+        "expires_at": 1234567890
+    }
+
+
+@pytest.fixture
+def token_path(monkeypatch, tmp_path):
+    """Point token storage at a file in the test's temporary directory."""
+    path = tmp_path / f"{USERNAME}_token.json"
+    monkeypatch.setattr(secure_storage, "get_token_path", lambda username: path)
+    return path
 
-class TestSecureTokenStorage(unittest.TestCase):
-    """Test secure token storage functionality."""
+
+@pytest.mark.usefixtures("fast_kdf")
+def test_save_and_load_tokens(token_path, tokens):
+    """Test saving and loading tokens with encryption."""
+    storage = SecureTokenStorage(USERNAME, PASSWORD)
     
-    def setUp(self):
-        """Set up test environment."""
-        self.test_dir = tempfile.mkdtemp()
-        self.username = "testuser"
-        self.password = "testpassword123"
-        self.test_tokens = {
-            "access_token": "test_access_token",
-            "refresh_token": "test_refresh_token",
-            "expires_at": 1234567890
-        }
-        
-    def test_save_and_load_tokens(self):
-        """Test saving and loading tokens with encryption."""
-        storage = SecureTokenStorage(self.username, self.password)
-        
-        # Mock the token path to use our test directory
-        with mock.patch('scripts.auth.secure_storage.get_token_path') as mock_path:
-            test_path = Path(self.test_dir) / f"{self.username}_token.json"
-            mock_path.return_value = test_path
-            
-            # Save tokens
-            self.assertTrue(storage.save_tokens(self.test_tokens))
-            self.assertTrue(test_path.exists())
-            
-            # Load tokens
-            loaded_tokens = storage.load_tokens()
-            self.assertEqual(loaded_tokens, self.test_tokens)
+    # Save tokens
+    assert storage.save_tokens(tokens)
+    assert token_path.exists()
     
-    def test_load_nonexistent_tokens(self):
-        """Test loading tokens when no token file exists."""
-        storage = SecureTokenStorage("nonexistent_user", self.password)
-        self.assertIsNone(storage.load_tokens())
+    # Load tokens
+    assert storage.load_tokens() == tokens
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX file permissions")
+@pytest.mark.usefixtures("fast_kdf")
+def test_save_tokens_owner_only(token_path, tokens):
+    """Test saved tokens are owner-only even if a stale temp file exists."""
+    stale = token_path.with_name(token_path.name + ".tmp")
+    stale.write_bytes(b"stale")
+    stale.chmod(0o644)
+    storage = SecureTokenStorage(USERNAME, PASSWORD)
     
-    def test_clear_tokens(self):
-        """Test clearing stored tokens."""
-        storage = SecureTokenStorage(self.username, self.password)
-        
-        with mock.patch('scripts.auth.secure_storage.get_token_path') as mock_path:
-            test_path = Path(self.test_dir) / f"{self.username}_token.json"
-            mock_path.return_value = test_path
-            
-            # Save then clear tokens
-            storage.save_tokens(self.test_tokens)
-            self.assertTrue(test_path.exists())
-            
-            self.assertTrue(storage.clear_tokens())
-            self.assertFalse(test_path.exists())
+    assert storage.save_tokens(tokens)
+    assert token_path.stat().st_mode & 0o777 == 0o600
+    assert not stale.exists()
+
+
+def test_load_nonexistent_tokens(token_path):
+    """Test loading tokens when no token file exists."""
+    storage = SecureTokenStorage("nonexistent_user", PASSWORD)
+    assert storage.load_tokens() is None
+
+
+@pytest.mark.usefixtures("fast_kdf")
+def test_clear_tokens(token_path, tokens):
+    """Test clearing stored tokens."""
+    storage = SecureTokenStorage(USERNAME, PASSWORD)
+    
+    # Save then clear tokens
+    storage.save_tokens(tokens)
+    assert token_path.exists()
+    
+    assert storage.clear_tokens()
+    assert not token_path.exists()
+
+
+def test_clear_nonexistent_tokens(token_path):
+    """Test clearing tokens when no token file exists."""
+    storage = SecureTokenStorage("nonexistent_user", PASSWORD)
+    assert storage.clear_tokens()
+
+
+def test_generate_key_from_password(derived_key):
+    """Test key generation from password."""
+    key1, salt1 = derived_key
     
-    def test_clear_nonexistent_tokens(self):
-        """Test clearing tokens when no token file exists."""
-        storage = SecureTokenStorage("nonexistent_user", self.password)
-        self.assertTrue(storage.clear_tokens())
+    # The key is PBKDF2-HMAC-SHA256 of the password and salt; derive it
+    # directly, since a second generate_key_from_password() call would only
+    # hit its cache
+    expected = hashlib.pbkdf2_hmac(
+        'sha256', KDF_PASSWORD.encode(), salt1,
+        secure_storage.ITERATIONS, secure_storage.KEY_LENGTH,
+    )
+    assert key1 == base64.b64encode(expected)
     
-    def test_generate_key_from_password(self):
-        """Test key generation from password."""
-        from scripts.auth.secure_storage import generate_key_from_password
-        
-        password = "testpassword"
-        key1, salt1 = generate_key_from_password(password)
-        key2, salt2 = generate_key_from_password(password, salt1)
-        
-        # Same password and salt should produce same key
-        self.assertEqual(key1, key2)
-        
-        # Different salt should produce different key
-        _, salt3 = generate_key_from_password(password)
-        key3, _ = generate_key_from_password(password, salt3)
-        self.assertNotEqual(key1, key3)
+    # Different salt should produce different key
+    salt3 = os.urandom(16)
+    key3, _ = generate_key_from_password(KDF_PASSWORD, salt3)
+    assert key1 != key3
@@ -0,0 +1,81 @@
+"""
+Tests for uploading the EPUB to Dropbox.
+"""
+import importlib
+from unittest import mock
+
+import dropbox
+import pytest
+from dropbox.exceptions import HttpError
+from dropbox.files import UploadSessionType
+
+# The scripts package exports the module's upload function under the same name
+upload = importlib.import_module("scripts.upload_to_dropbox")
+
+USERNAME = "testuser"
+TARGET = "/Apps/Rakuten Kobo/Daily-RSS.epub"
+DATA = b"0123456789"
+
+
+@pytest.fixture
+def dbx(monkeypatch):
+    """Mocked Dropbox client returned for the test user."""
+    client = mock.Mock(spec=dropbox.Dropbox)
+    client.files_upload_session_start.return_value.session_id = "session"
+    monkeypatch.setattr(upload, "get_dropbox_client", mock.Mock(return_value=client))
+    return client
+
+
+@pytest.fixture
+def epub(monkeypatch, tmp_path):
+    """A file spanning three upload chunks of four bytes."""
+    monkeypatch.setattr(upload, "CHUNK_SIZE", 4)
+    monkeypatch.setattr(upload, "UPLOAD_WORKERS", 2)
+    path = tmp_path / "test.epub"
+    path.write_bytes(DATA)
+    return path
+
+
+def test_upload_chunks_concurrently(dbx, epub):
+    """Test that each chunk is appended at its own offset and the session committed."""
+    assert upload.upload_to_dropbox(epub, USERNAME)
+
+    dbx.files_upload.assert_not_called()
+    dbx.files_upload_session_start.assert_called_once_with(
+        b"", session_type=UploadSessionType.concurrent
+    )
+
+    # Appends may complete in any order, so compare them by offset
+    appends = sorted(
+        (c.args[1].offset, c.args[1].session_id, c.args[0], c.kwargs["close"])
+        for c in dbx.files_upload_session_append_v2.call_args_list
+    )
+    assert appends == [
+        (0, "session", b"0123", False),
+        (4, "session", b"4567", False),
+        (8, "session", b"89", True),
+    ]
+
+    data, cursor, commit = dbx.files_upload_session_finish.call_args.args
+    assert data == b""
+    assert (cursor.session_id, cursor.offset) == ("session", len(DATA))
+    assert commit.path == TARGET
+    assert commit.mode.is_overwrite()
+
+
+def test_upload_chunks_error(dbx, epub):
+    """Test that a failed append aborts the upload without committing."""
+    dbx.files_upload_session_append_v2.side_effect = HttpError("request", 500, "error")
+
+    assert not upload.upload_to_dropbox(epub, USERNAME)
+    dbx.files_upload_session_finish.assert_not_called()
+
+
+def test_upload_small_file(dbx, tmp_path):
+    """Test that a file of at most one chunk is uploaded in a single request."""
+    path = tmp_path / "test.epub"
+    path.write_bytes(DATA)
+
+    assert upload.upload_to_dropbox(path, USERNAME)
+    dbx.files_upload.assert_called_once_with(DATA, TARGET, mode=mock.ANY)
+    dbx.files_upload_session_start.assert_not_called()
@@ -4,26 +4,40 @@ Dropbox upload module for RSS to Kobo.
 
 import argparse
 import logging
+import os
 import sys
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Union
-
-import dropbox
-from dropbox import Dropbox
-from dropbox.exceptions import ApiError, AuthError, BadInputError, HttpError
-from dropbox.files import WriteMode, UploadSessionCursor, CommitInfo
+from typing import TYPE_CHECKING, Deque, Optional, Tuple, Union
 
 from .auth.oauth_handler import OAuthHandler
 from .utils import get_output_path
 from .utils.logging_utils import setup_logger
 
+# The Dropbox SDK is imported where it is used so that importing this module
+# (e.g. for --help or test collection) does not load it
+if TYPE_CHECKING:
+    from dropbox import Dropbox
+
 logger = setup_logger(__name__)
 CHUNK_SIZE = 4 * 1024 * 1024  # 4MB chunks for large file uploads
+UPLOAD_WORKERS = 4  # Chunks in flight at once for large file uploads
+
 
+@lru_cache(maxsize=16)
+def _get_handler(username: str) -> OAuthHandler:
+    """Get the OAuth handler for a user, shared across uploads in this process."""
+    return OAuthHandler(username)
 
-def get_dropbox_client(username: str) -> Optional[Dropbox]:
+
+def get_dropbox_client(username: str) -> Optional['Dropbox']:
     """Get an authenticated Dropbox client for the specified user.
 
+    The user's handler is cached, so repeated calls reuse the decrypted
+    tokens and the existing client until the access token changes.
+
     Args:
         username: The username to get a client for
 
@@ -31,13 +45,72 @@ def get_dropbox_client(username: str) -> Optional[Dropbox]:
         An authenticated Dropbox client or None if authentication fails
     """
     try:
-        handler = OAuthHandler(username)
-        return handler.get_authenticated_client()
+        return _get_handler(username).get_authenticated_client()
     except Exception as e:
         logger.error(f"Failed to authenticate user '{username}': {e}")
         return None
 
 
+def clear_client_cache() -> None:
+    """Forget cached handlers and clients, e.g. between tests or after logout."""
+    _get_handler.cache_clear()
+
+
+def _upload_chunks_concurrently(
+    dbx: 'Dropbox', local_path: Path, file_size: int, target_path: str
+) -> None:
+    """Upload a large file through a concurrent upload session.
+
+    Chunks are appended at their own offsets by a small thread pool, so
+    several requests are in flight at once instead of one round trip per
+    chunk. At most UPLOAD_WORKERS chunks are held in memory at a time. Every
+    chunk but the last must be a multiple of 4 MB, which CHUNK_SIZE is.
+
+    Args:
+        dbx: Authenticated Dropbox client
+        local_path: Path to local file to upload
+        file_size: Size of the local file in bytes
+        target_path: Destination path in Dropbox
+    """
+    from dropbox.files import CommitInfo, UploadSessionCursor, UploadSessionType, WriteMode
+
+    session_id = dbx.files_upload_session_start(
+        b"", session_type=UploadSessionType.concurrent
+    ).session_id
+
+    # One reusable read buffer for all chunks; the SDK only accepts
+    # bytes, so each chunk is still copied out of it once
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    pending: Deque[Tuple[Future, int]] = deque()
+    offset = 0
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor, open(local_path, "rb") as f:
+        while offset < file_size:
+            n = f.readinto(buf)
+            if not n:
+                raise OSError(f"{local_path} shrank during upload")
+            cursor = UploadSessionCursor(session_id=session_id, offset=offset)
+            offset += n
+            future = executor.submit(
+                dbx.files_upload_session_append_v2,
+                bytes(view[:n]), cursor, close=offset >= file_size
+            )
+            pending.append((future, offset))
+
+            # Bound memory use by waiting for the oldest chunk once the pool is full
+            while len(pending) >= UPLOAD_WORKERS or (pending and offset >= file_size):
+                future, uploaded = pending.popleft()
+                future.result()
+                logger.debug("Uploaded %d/%d bytes (%.1f%%)",
+                           uploaded, file_size, uploaded / file_size * 100)
+
+    dbx.files_upload_session_finish(
+        b"",
+        UploadSessionCursor(session_id=session_id, offset=file_size),
+        CommitInfo(path=target_path, mode=WriteMode('overwrite'))
+    )
+
+
 def upload_to_dropbox(
     local_path: Union[str, Path], username: str, target_filename: str = "Daily-RSS.epub"
 ) -> bool:
@@ -54,61 +127,38 @@ def upload_to_dropbox(
     # Always use the Kobo-specific folder
     target_path = f"/Apps/Rakuten Kobo/{target_filename}"
     local_path = Path(local_path)
-    if not local_path.exists():
+    # One stat both checks the file exists and sizes it for the upload
+    try:
+        file_size = os.stat(local_path).st_size
+    except FileNotFoundError:
         logger.error("Local file not found: %s", local_path)
         return False
 
-    dbx = None
+    from dropbox.exceptions import ApiError, AuthError, BadInputError, HttpError
+    from dropbox.files import WriteMode
+
     try:
-        # Get authenticated client
+        # Get authenticated client (cached and reused, so it is not closed here)
         dbx = get_dropbox_client(username)
         if not dbx:
             logger.error("Failed to authenticate with Dropbox for user: %s", username)
             return False
 
-        # Get file size for progress tracking
-        file_size = local_path.stat().st_size
         logger.info("Uploading %s (%.1f MB) to Dropbox as '%s'...", 
                    local_path.name, file_size / (1024 * 1024), target_filename)
 
         # Use chunked upload for large files
         if file_size <= CHUNK_SIZE:
+            # The SDK only accepts bytes (no streams or buffers), so this is a
+            # single read sized from the stat above
             with open(local_path, "rb") as f:
                 dbx.files_upload(
-                    f.read(), 
+                    f.read(file_size), 
                     target_path,
                     mode=WriteMode('overwrite')
                 )
         else:
-            with open(local_path, "rb") as f:
-                # Start the upload session
-                upload_session_start_result = dbx.files_upload_session_start(
-                    f.read(CHUNK_SIZE))
-                cursor = UploadSessionCursor(
-                    session_id=upload_session_start_result.session_id,
-                    offset=f.tell()
-                )
-                commit = CommitInfo(
-                    path=target_path,
-                    mode=WriteMode('overwrite')
-                )
-
-                # Upload in chunks
-                while f.tell() < file_size:
-                    remaining = file_size - f.tell()
-                    chunk_size = min(CHUNK_SIZE, remaining)
-                    chunk = f.read(chunk_size)
-                    
-                    if remaining <= CHUNK_SIZE:
-                        dbx.files_upload_session_finish(chunk, cursor, commit)
-                    else:
-                        dbx.files_upload_session_append_v2(chunk, cursor)
-                        cursor.offset = f.tell()
-                        
-                    # Log progress
-                    progress = (f.tell() / file_size) * 100
-                    logger.debug("Uploaded %d/%d bytes (%.1f%%)",
-                               f.tell(), file_size, progress)
+            _upload_chunks_concurrently(dbx, local_path, file_size, target_path)
 
         logger.info("✅ Successfully uploaded '%s' to Dropbox", target_filename)
         return True
@@ -122,12 +172,6 @@ def upload_to_dropbox(
         logger.error("❌ Dropbox request failed: %s", str(e))
     except Exception as e:
         logger.error("❌ Unexpected error during upload: %s", str(e), exc_info=True)
-    finally:
-        if dbx:
-            try:
-                dbx.close()
-            except Exception:
-                pass  # Ignore errors during client cleanup
 
     return False
 
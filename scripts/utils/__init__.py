@@ -9,6 +9,7 @@ from .logging_utils import setup_logger, log_execution_time
 from .general import (
     clean_html,
     format_date,
+    format_dates,
     get_output_path,
     load_feeds_config
 )
@@ -21,6 +22,7 @@ __all__ = [
     # General utilities
     'clean_html',
     'format_date',
+    'format_dates',
     'get_output_path',
     'load_feeds_config',
 ]
@@ -1,20 +1,95 @@
 """
 General utility functions for RSS to Kobo pipeline.
 """
+import copy
 import os
 import logging
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-import yaml
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
 from pathlib import Path
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Feed configs directory, resolved once from this file's location
+# (scripts/utils/general.py -> <repo>/config/feeds)
+_CONFIG_ROOT = Path(__file__).resolve().parents[2] / "config" / "feeds"
+_CONFIG_ROOT_EXISTS: Optional[bool] = None
+
+# Parsed feed configs by path, with the st_mtime_ns they were parsed at
+_CONFIG_CACHE: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+@lru_cache(maxsize=1)
+def _get_cleaner():
+    """Get the cleaner that strips scripts, styles and unsafe attributes.
+    
+    lxml is imported on first use so importing this module stays cheap.
+    """
+    from lxml.html.clean import Cleaner
+    return Cleaner(
+        scripts=True,
+        javascript=True,
+        comments=True,
+        style=True,
+        inline_style=True,
+        meta=True,
+        page_structure=False,
+        safe_attrs_only=True,
+    )
+
+@lru_cache(maxsize=1)
+def _get_yaml_loader():
+    """Get the fastest safe YAML loader available.
+    
+    PyYAML is imported on first use so importing this module stays cheap.
+    """
+    try:
+        from yaml import CSafeLoader
+        return CSafeLoader
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader
+        return SafeLoader
+
+def _find_config_path(user: str) -> Path:
+    """
+    Get the path of a user's feed config.
+    
+    Configs live in the repository's config/feeds directory. Only when that
+    directory is missing (e.g. an installed copy of the package) are the
+    legacy locations relative to the working directory probed.
+    
+    Raises:
+        FileNotFoundError: If no legacy location has the config file
+    """
+    global _CONFIG_ROOT_EXISTS
+    if _CONFIG_ROOT_EXISTS is None:
+        _CONFIG_ROOT_EXISTS = _CONFIG_ROOT.is_dir()
+    if _CONFIG_ROOT_EXISTS:
+        return _CONFIG_ROOT / f"{user}.yaml"
+    
+    # Look for config in both the current directory and one level up
+    possible_paths = [
+        Path("config") / "feeds" / f"{user}.yaml",  # Current directory
+        Path("..") / "config" / "feeds" / f"{user}.yaml",  # One level up
+        Path("..") / ".." / "config" / "feeds" / f"{user}.yaml"  # Two levels up (for scripts/ directory)
+    ]
+    
+    for path in possible_paths:
+        if path.exists():
+            return path
+    
+    error_msg = f"Config file not found. Tried: {[str(p) for p in possible_paths]}"
+    logger.error(error_msg)
+    raise FileNotFoundError(error_msg)
+
 def load_feeds_config(user: str) -> Dict[str, Any]:
     """
     Load feed configuration for a specific user.
     
+    Parsed configs are cached until the file's modification time changes.
+    Each call returns its own copy, since callers fill in per-feed defaults.
+    
     Args:
         user: Username to load feeds for
         
@@ -25,28 +100,25 @@ def load_feeds_config(user: str) -> Dict[str, Any]:
         FileNotFoundError: If the config file doesn't exist
         yaml.YAMLError: If there's an error parsing the YAML
     """
-    # Look for config in both the current directory and one level up
-    possible_paths = [
-        Path("config") / "feeds" / f"{user}.yaml",  # Current directory
-        Path("..") / "config" / "feeds" / f"{user}.yaml",  # One level up
-        Path("..") / ".." / "config" / "feeds" / f"{user}.yaml"  # Two levels up (for scripts/ directory)
-    ]
+    config_path = _find_config_path(user)
+    try:
+        mtime = config_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        error_msg = f"Config file not found: {config_path}"
+        logger.error(error_msg)
+        raise FileNotFoundError(error_msg) from None
     
-    config_path = None
-    for path in possible_paths:
-        if path.exists():
-            config_path = path
-            break
+    cache_key = str(config_path)
+    cached = _CONFIG_CACHE.get(cache_key)
+    if cached is not None and cached[0] == mtime:
+        return copy.deepcopy(cached[1])
     
-    if not config_path:
-        error_msg = f"Config file not found. Tried: {[str(p) for p in possible_paths]}"
-        logger.error(error_msg)
-        raise FileNotFoundError(error_msg)
+    import yaml
     
     try:
         logger.info(f"Loading configuration from: {config_path}")
         with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = yaml.safe_load(f) or {}
+            config_data = yaml.load(f, Loader=_get_yaml_loader()) or {}
             
         # Ensure required fields exist
         if not config_data.get('feeds'):
@@ -68,17 +140,32 @@ def load_feeds_config(user: str) -> Dict[str, Any]:
         config_data['dropbox'].setdefault('target_folder', "/RSS Feeds")
         config_data['dropbox'].setdefault('filename', "Daily-RSS.epub")
         
-        return config_data
+        _CONFIG_CACHE[cache_key] = (mtime, config_data)
+        return copy.deepcopy(config_data)
         
     except yaml.YAMLError as e:
         error_msg = f"Error parsing YAML config at {config_path}: {e}"
         logger.error(error_msg)
         raise yaml.YAMLError(error_msg) from e
 
+# Mirror the lru_cache API so tests can reset the cache the same way
+load_feeds_config.cache_clear = _CONFIG_CACHE.clear
+
+# Output directories already created by this process
+_ENSURED_DIRS: Set[Path] = set()
+
+@lru_cache(maxsize=1)
+def _run_timestamp() -> str:
+    """Get the timestamp naming this run's output files, fixed at first use."""
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
 def get_output_path(user: str) -> Path:
     """
     Get the output path for a user's EPUB file.
     
+    All files of one run share the run's timestamp, so calling this again
+    for the same user in the same process returns the same path.
+    
     Args:
         user: Username
         
@@ -86,27 +173,73 @@ def get_output_path(user: str) -> Path:
         Path object for the output EPUB file
     """
     output_dir = Path("output")
-    output_dir.mkdir(exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return output_dir / f"{user}_rss_{timestamp}.epub"
+    if output_dir not in _ENSURED_DIRS:
+        output_dir.mkdir(exist_ok=True)
+        _ENSURED_DIRS.add(output_dir)
+    return output_dir / f"{user}_rss_{_run_timestamp()}.epub"
 
 def clean_html(html_content: str) -> str:
     """
     Clean HTML content for better EPUB display.
     
+    Removes scripts, styles, comments and unsafe attributes using lxml's
+    C-based parser.
+    
     Args:
         html_content: Raw HTML content
         
     Returns:
         Cleaned HTML content
     """
-    # Basic HTML cleaning can be added here
-    return html_content.strip()
+    if not html_content or not html_content.strip():
+        return ""
+    import lxml.html
+    from lxml.etree import ParserError
+    try:
+        try:
+            document = lxml.html.fromstring(html_content)
+        except ValueError:
+            # lxml rejects str input that carries an XML encoding declaration;
+            # the text is already decoded, so parse it as UTF-8 bytes instead.
+            # Parsers are not thread-safe, so this rare path gets its own.
+            document = lxml.html.fromstring(
+                html_content.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8')
+            )
+        tree = _get_cleaner().clean_html(document)
+    except ParserError:
+        return html_content.strip()
+    return lxml.html.tostring(tree, encoding='unicode').strip()
+
+DISPLAY_DATE_FORMAT = "%B %d, %Y at %I:%M %p"
+
+@lru_cache(maxsize=1024)
+def _format_date_cached(date_str: str) -> Optional[str]:
+    """
+    Parse and format a date string, memoized per input string.
+    
+    Returns:
+        Formatted date string, or None if the string could not be parsed
+    """
+    try:
+        date_obj = datetime.fromisoformat(date_str)
+    except ValueError:
+        # Before Python 3.11, fromisoformat rejects a trailing 'Z'
+        if not date_str.endswith('Z'):
+            return None
+        try:
+            date_obj = datetime.fromisoformat(date_str[:-1] + '+00:00')
+        except ValueError:
+            return None
+    except (TypeError, AttributeError):
+        return None
+    return date_obj.strftime(DISPLAY_DATE_FORMAT)
 
 def format_date(date_str: Optional[str] = None) -> str:
     """
     Format a date string for display in the EPUB.
     
+    Feeds often repeat publication timestamps, so parsed dates are cached.
+    
     Args:
         date_str: Optional date string to format. If None, uses current date.
         
@@ -114,12 +247,33 @@ def format_date(date_str: Optional[str] = None) -> str:
         Formatted date string
     """
     if date_str:
-        try:
-            # Try to parse the input date string
-            date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            date_obj = datetime.now()
-    else:
-        date_obj = datetime.now()
+        formatted = _format_date_cached(date_str)
+        if formatted is not None:
+            return formatted
         
-    return date_obj.strftime("%B %d, %Y at %I:%M %p")
+    return datetime.now().strftime(DISPLAY_DATE_FORMAT)
+
+def format_dates(date_strs: Iterable[Optional[str]]) -> List[str]:
+    """
+    Format a batch of date strings for display, e.g. all of a feed's articles.
+    
+    Each distinct string is parsed once, however often it repeats.
+    
+    Args:
+        date_strs: Date strings to format; missing or unparsable ones get the
+            current date, as with format_date
+        
+    Returns:
+        Formatted date strings, in the same order
+    """
+    date_strs = list(date_strs)
+    formatted = dict.fromkeys(date_strs)
+    now = None
+    for date_str in formatted:
+        value = _format_date_cached(date_str) if date_str else None
+        if value is None:
+            if now is None:
+                now = datetime.now().strftime(DISPLAY_DATE_FORMAT)
+            value = now
+        formatted[date_str] = value
+    return [formatted[date_str] for date_str in date_strs]
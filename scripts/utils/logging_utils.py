@@ -5,6 +5,8 @@ This module provides consistent logging configuration and utilities.
 """
 import logging
 import sys
+import time
+from functools import wraps
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Optional, Dict, Any
@@ -15,6 +17,18 @@ LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 LOG_MAX_BYTES = 10 * 1024 * 1024  # 10 MB
 LOG_BACKUP_COUNT = 5
 
+# Formatter shared by every handler setup_logger creates
+_FORMATTER = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+
+def _is_handled_by_ancestor(logger: logging.Logger) -> bool:
+    """Check whether the logger's records already reach a configured ancestor's handlers."""
+    current = logger
+    while current.propagate and current.parent is not None:
+        current = current.parent
+        if current.handlers:
+            return True
+    return False
+
 # Log levels as strings for configuration
 LOG_LEVELS = {
     'DEBUG': logging.DEBUG,
@@ -33,6 +47,10 @@ def setup_logger(
     """
     Configure and return a logger with the specified settings.
     
+    If logging has already been configured (e.g. with ``dictConfig``) and an
+    ancestor logger handles this one, the logger is left to inherit that
+    configuration: no console handler is added and its level is not pinned.
+    
     Args:
         name: Logger name (usually __name__)
         log_level: Logging level (default: INFO)
@@ -48,15 +66,19 @@ def setup_logger(
     if logger.hasHandlers():
         logger.handlers.clear()
     
+    # Defer to the application's logging configuration when there is one
+    configured = _is_handled_by_ancestor(logger)
+    
     # Set log level
-    level = LOG_LEVELS.get(log_level.upper(), logging.INFO)
-    logger.setLevel(level)
+    if configured:
+        logger.setLevel(logging.NOTSET)
+    else:
+        logger.setLevel(LOG_LEVELS.get(log_level.upper(), logging.INFO))
     
-    # Create formatter
-    formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+    formatter = _FORMATTER
     
     # Add console handler if requested
-    if console:
+    if console and not configured:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         logger.addHandler(console_handler)
@@ -92,18 +114,19 @@ def log_execution_time(logger: logging.Logger):
         Decorator function
     """
     def decorator(func):
-        import time
-        from functools import wraps
-        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            logger.debug("Starting %s", func.__name__)
+            # Only time the call when the timing messages would be emitted
+            debug = logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                start_time = time.perf_counter()
+                logger.debug("Starting %s", func.__name__)
             
             try:
                 result = func(*args, **kwargs)
-                elapsed = time.time() - start_time
-                logger.debug("Completed %s in %.2f seconds", func.__name__, elapsed)
+                if debug:
+                    elapsed = time.perf_counter() - start_time
+                    logger.debug("Completed %s in %.2f seconds", func.__name__, elapsed)
                 return result
             except Exception as e:
                 logger.error("Error in %s: %s", func.__name__, e, exc_info=True)
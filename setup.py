@@ -10,6 +10,7 @@ setup(
         'python-dotenv>=0.19.0',
         'cryptography>=36.0.0',
         'requests>=2.25.0',
+        'PyYAML>=5.1',
     ],
     entry_points={
         'console_scripts': [
@@ -17,11 +17,6 @@ import yaml
 project_root = Path(__file__).parent.absolute()
 sys.path.insert(0, str(project_root))
 
-# Mock the required modules
-sys.modules['feedparser'] = MagicMock()
-sys.modules['ebooklib'] = MagicMock()
-sys.modules['ebooklib.epub'] = MagicMock()
-
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -33,34 +28,33 @@ def test_feed_fetcher():
     """Test the FeedFetcher class with mock data."""
     from scripts.fetch_and_build import FeedFetcher
     from unittest.mock import patch, MagicMock
-    import feedparser
+    import tempfile
     
     logger.info("Testing FeedFetcher with mock data...")
     
-    # Create a mock for feedparser.parse
-    mock_feed = MagicMock()
-    mock_feed.entries = [
-        {
-            'title': 'Test Article 1',
-            'link': 'https://example.com/test1',
-            'published': '2023-01-01T12:00:00Z',
-            'author': 'Test Author',
-            'content': [{'value': '<p>Test content 1</p>'}],
-            'summary': 'Test summary 1',
-            'description': 'Test description 1'
-        },
-        {
-            'title': 'Test Article 2',
-            'link': 'https://example.com/test2',
-            'published': '2023-01-02T12:00:00Z',
-            'author': 'Test Author 2',
-            'content': [{'value': '<p>Test content 2</p>'}],
-            'summary': 'Test summary 2',
-            'description': 'Test description 2'
-        }
-    ]
-    mock_feed.get.return_value = []
-    mock_feed.bozo = 0
+    # Sample feed document returned instead of downloading
+    mock_feed = b"""<?xml version="1.0"?>
+    <rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+      <channel>
+        <title>Test Feed</title>
+        <item>
+          <title>Test Article 1</title>
+          <link>https://example.com/test1</link>
+          <pubDate>2023-01-01T12:00:00Z</pubDate>
+          <author>Test Author</author>
+          <content:encoded><![CDATA[<p>Test content 1</p>]]></content:encoded>
+          <description>Test summary 1</description>
+        </item>
+        <item>
+          <title>Test Article 2</title>
+          <link>https://example.com/test2</link>
+          <pubDate>2023-01-02T12:00:00Z</pubDate>
+          <author>Test Author 2</author>
+          <content:encoded><![CDATA[<p>Test content 2</p>]]></content:encoded>
+          <description>Test summary 2</description>
+        </item>
+      </channel>
+    </rss>"""
     
     # Create a mock for load_feeds_config
     mock_config = {
@@ -79,7 +73,12 @@ def test_feed_fetcher():
         }
     }
     
-    with patch('feedparser.parse', return_value=mock_feed), \
+    mock_response = MagicMock(status_code=200, content=mock_feed, headers={})
+    
+    # Keep the article and feed caches out of the user's cache directory
+    with tempfile.TemporaryDirectory() as cache_dir, \
+         patch('scripts.fetch_and_build.CACHE_DIR', Path(cache_dir)), \
+         patch.object(FeedFetcher, '_download', return_value=mock_response), \
          patch('scripts.fetch_and_build.load_feeds_config', return_value=mock_config):
         
         # Initialize FeedFetcher with mock config
@@ -118,6 +117,7 @@ def test_epub_creation():
     """Test EPUB creation with sample data."""
     from scripts.epub_builder import EPUBCreator
     from pathlib import Path
+    from unittest.mock import patch
     import tempfile
     
     logger.info("Testing EPUB creation...")
@@ -155,7 +155,10 @@ def test_epub_creation():
             
             # Create the EPUB file
             output_path = Path(temp_dir) / "test_output.epub"
-            creator.save(output_path)
+            with patch('scripts.epub_builder.get_output_path', return_value=output_path):
+                if creator.generate() != output_path:
+                    logger.error("EPUB was written to an unexpected path")
+                    return False
             
             # Verify the file was created
             if not output_path.exists():